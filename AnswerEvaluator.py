@@ -1,33 +1,21 @@
 import streamlit as st
-import ollama
-import nltk
-from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
-from rouge_score import rouge_scorer
-from nltk.tokenize import TreebankWordTokenizer
-import json
-import re
-import evaluate
-
-tokenizer = TreebankWordTokenizer()
+from llm_client import get_llm_pool
+from llm_json import parse_or_repair
+from grading import evaluation_request
+from bertscore_engine import get_bertscore_engine
+from scoring import get_metric_pipeline
 
 # Function to calculate BLEU score
 def calculate_bleu(reference, candidate):
-    reference_tokens = [tokenizer.tokenize(reference.lower())]
-    candidate_tokens = tokenizer.tokenize(candidate.lower())
-    smoothie = SmoothingFunction().method4
-    return sentence_bleu(reference_tokens, candidate_tokens, smoothing_function=smoothie) * 100
+    return get_metric_pipeline().bleu(reference, candidate)
 
 # Function to calculate ROUGE-L score
 def calculate_rouge_l(reference, candidate):
-    scorer = rouge_scorer.RougeScorer(['rougeL'], use_stemmer=True)
-    scores = scorer.score(reference, candidate)
-    return scores['rougeL'].fmeasure * 100
+    return get_metric_pipeline().rouge_l(reference, candidate)
 
 # BERTScore
 def calculate_bertscore(reference, candidate):
-    bertscore = evaluate.load("bertscore")
-    result = bertscore.compute(predictions=[candidate], references=[reference], lang="en")
-    return result["f1"][0] * 100
+    return get_bertscore_engine().score([reference], [candidate])[0]
 
 # ✅ MAIN FUNCTION to be called from menu.py
 def app():
@@ -46,48 +34,13 @@ def app():
                 rouge_score = round(calculate_rouge_l(correct_answer, user_answer), 2)
                 bert_score = round(calculate_bertscore(correct_answer, user_answer), 2)
 
-                # Prompt to Ollama for scoring
-                prompt = f"""
-                You are an expert answer evaluator. Compare the student's answer with the reference answer to the question.
-
-                ### Question:
-                {question}
-
-                ### Reference Answer:
-                {correct_answer}
-
-                ### Student Answer:
-                {user_answer}
-
-                Evaluation Guidelines:
-                1. "correctness": 1 if the student's answer includes at least 50% of the key reasons from the reference answer; otherwise 0.
-                2. "completeness": Score 0–100 based on how many key points from the reference are covered. Partial matches are allowed.
-                3. "relevance": Score 0–100 based on how focused the student's answer is on valid reasons for deforestation.
-                4. "depth": Score 0–100 based on the richness of explanation (just listing is low depth, reasoning is high depth).
-
-                Respond ONLY in valid JSON format like this:
-                ```json
-                {{
-                "correctness": 1,
-                "completeness": 60,
-                "relevance": 70,
-                "depth": 40
-                }}
-                """
                 try:
-                    response = ollama.chat(
-                        model="deepseek-r1:1.5b",
-                        messages=[{"role": "user", "content": prompt}],
-                        options={
-                            "temperature": 0  # makes response deterministic
-                        }
-                       )
+                    request = evaluation_request(question, correct_answer, user_answer)
+                    response = get_llm_pool().chat(**request)
 
                     content = response['message']['content']
-                    json_text = re.search(r'\{.*\}', content, re.DOTALL)
-                    if json_text:
-                        result_json = json.loads(json_text.group(0))
-                    else:
+                    result_json = parse_or_repair(content, "evaluation", request["model"], workload="evaluation")
+                    if result_json is None:
                         st.error("❌ Failed to extract JSON from model response.")
                         st.text(content)
                         return
@@ -7,6 +7,10 @@ import AnswerEvaluator
 import UserAnswerFeedback
 import UserAnswerEvaluator
 import admin_user_manager
+from model_sessions import get_model_sessions
+
+# Load the model while the user is still logging in (once per server process).
+get_model_sessions().prewarm_once()
 
 # Initialize login state
 if "logged_in" not in st.session_state:
@@ -1,17 +1,10 @@
 import streamlit as st
-import psycopg2
+from db import get_connection
+from question_catalog import get_question_catalog, QUESTION_COLUMNS
+from pagination import paginate_questions, render_page_controls
 from datetime import datetime
 import logging
 
-def get_connection():
-    return psycopg2.connect(
-        host="localhost",
-        port=5432,
-        database="llmqa",
-        user="postgres",
-        password="postgres"
-    )
-
 def app():  # 👈 Wrap everything in this function
     st.title("Question Entry Form")
 
@@ -25,16 +18,18 @@ def app():  # 👈 Wrap everything in this function
             st.warning("Please fill in all fields.")
         else:
             try:
-                conn = get_connection()
-                cur = conn.cursor()
-                insert_query = """
-                    INSERT INTO questions (topic_name, question, answer, created_by, created_at)
-                    VALUES (%s, %s, %s, %s, %s)
-                """
-                cur.execute(insert_query, (topic, question, answer, created_by, datetime.now()))
-                conn.commit()
-                cur.close()
-                conn.close()
+                with get_connection() as conn:
+                    cur = conn.cursor()
+                    insert_query = """
+                        INSERT INTO questions (topic_name, question, answer, created_by, created_at)
+                        VALUES (%s, %s, %s, %s, %s)
+                        RETURNING id
+                    """
+                    cur.execute(insert_query, (topic, question, answer, created_by, datetime.now()))
+                    new_id = cur.fetchone()[0]
+                    conn.commit()
+                    cur.close()
+                get_question_catalog().mark_changed([new_id])
                 st.success("✅ Question saved to database!")
             except Exception as e:
                 st.error("❌ Failed to insert data.")
@@ -44,18 +39,16 @@ def app():  # 👈 Wrap everything in this function
     st.header("📋 View / Update / Delete Questions")
 
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT id, topic_name, question, answer, created_by, created_at FROM questions ORDER BY id DESC")
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
+        topic_filter = st.selectbox("Filter by Topic", ["All topics"] + get_question_catalog().topics(), key="qanda_topic")
+        rows, has_next = paginate_questions(
+            "qanda_page", None if topic_filter == "All topics" else topic_filter, descending=True
+        )
 
         if not rows:
             st.info("No questions found.")
         else:
             for row in rows:
-                qid, topic, updatequestion, updateanswer, uid, created_at = row
+                qid, topic, updatequestion, updateanswer, uid, created_at = (row[column] for column in QUESTION_COLUMNS)
 
                 with st.expander(f"🔹 {topic} (by {uid} at {created_at.strftime('%Y-%m-%d %H:%M:%S')})"):
                     st.write("**Question:**", updatequestion)
@@ -74,16 +67,16 @@ def app():  # 👈 Wrap everything in this function
 
                         if st.button("💾 Save", key=f"save_{qid}"):
                             try:
-                                conn = get_connection()
-                                cur = conn.cursor()
-                                cur.execute("""
-                                    UPDATE questions
-                                    SET question = %s, answer = %s
-                                    WHERE id = %s
-                                """, (new_question, new_answer, qid))
-                                conn.commit()
-                                cur.close()
-                                conn.close()
+                                with get_connection() as conn:
+                                    cur = conn.cursor()
+                                    cur.execute("""
+                                        UPDATE questions
+                                        SET question = %s, answer = %s
+                                        WHERE id = %s
+                                    """, (new_question, new_answer, qid))
+                                    conn.commit()
+                                    cur.close()
+                                get_question_catalog().mark_changed([qid])
                                 st.success("✅ Updated successfully.")
                                 st.rerun()
                             except Exception as e:
@@ -93,18 +86,20 @@ def app():  # 👈 Wrap everything in this function
                     with col2:
                         if st.button("🗑️ Delete", key=f"delete_{qid}"):
                             try:
-                                conn = get_connection()
-                                cur = conn.cursor()
-                                cur.execute("DELETE FROM questions WHERE id = %s", (qid,))
-                                conn.commit()
-                                cur.close()
-                                conn.close()
+                                with get_connection() as conn:
+                                    cur = conn.cursor()
+                                    cur.execute("DELETE FROM questions WHERE id = %s", (qid,))
+                                    conn.commit()
+                                    cur.close()
+                                get_question_catalog().mark_deleted([qid])
                                 st.warning("🗑️ Question deleted.")
                                 st.rerun()
                             except Exception as e:
                                 st.error("Delete failed!")
                                 st.exception(e)
 
+            render_page_controls("qanda_page", rows, has_next)
+
     except Exception as e:
         st.error("❌ Could not fetch data")
         st.exception(e)
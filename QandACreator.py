@@ -1,47 +1,38 @@
 import streamlit as st
-from langchain_community.document_loaders import PDFPlumberLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.vectorstores import InMemoryVectorStore
-from langchain_ollama import OllamaEmbeddings
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_ollama.llms import OllamaLLM
 from datetime import datetime
-import psycopg2
+from db import get_connection
+from bulk_writer import write_rows
+from dedup_index import get_duplicate_index
+from model_sessions import get_model_sessions
+from llm_json import parse_or_repair
+from question_catalog import get_question_catalog
+from document_index import DocumentIndex, content_hash
+from ingestion import build_embeddings, get_ingestion_queue
+from question_bank import (
+    PROMPT_TEMPLATE, QUESTION_INSERT_COLUMNS, start_question_bank_job, get_question_bank_job
+)
 import logging
-import re
-import json
-
-# --- DB Connection Function ---
-def get_connection():
-    return psycopg2.connect(
-        host="localhost",
-        port=5432,
-        database="llmqa",
-        user="postgres",
-        password="postgres"
-    )
 
 # --- Insert Q&A to DB ---
 def save_qa_to_db(topic, qa_pairs, created_by="admin"):
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        insert_query = """
-            INSERT INTO questions (topic_name, question, answer, created_by, created_at)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        for pair in qa_pairs:
-            cur.execute(insert_query, (
-                topic,
-                pair.get("question"),
-                pair.get("answer"),
-                created_by,
-                datetime.now()
-            ))
-        conn.commit()
-        cur.close()
-        conn.close()
+        # Near-duplicates of stored questions (or of each other) are not inserted again.
+        keep = get_duplicate_index(topic).filter_new([pair.get("question") for pair in qa_pairs])
+        skipped = len(qa_pairs) - len(keep)
+        qa_pairs = [qa_pairs[position] for position in keep]
+        now = datetime.now()
+        with get_connection() as conn:
+            new_ids = write_rows(
+                conn, "questions", QUESTION_INSERT_COLUMNS,
+                [(topic, pair.get("question"), pair.get("answer"), created_by, now) for pair in qa_pairs],
+                returning=["id"]
+            )
+        get_question_catalog().mark_changed([row[0] for row in new_ids])
         st.success("✅ Questions saved to database!")
+        if skipped:
+            st.info(f"Skipped {skipped} near-duplicate question(s).")
     except Exception as e:
         st.error("❌ Failed to insert data.")
         st.exception(e)
@@ -49,30 +40,11 @@ def save_qa_to_db(topic, qa_pairs, created_by="admin"):
 # --- Logging ---
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# --- LangChain Prompt ---
-PROMPT_TEMPLATE = """
-You are an expert assistant generating question-answer pairs from the given context.
-Return the output in JSON format as a list of objects. Each object must have a "question" and an "answer" field.
-If the context lacks clarity, return an empty list.
-
-Context:
-{document_context}
-
-Respond only in this JSON format:
-[
-  {{
-    "question": "What is ...?",
-    "answer": "..."
-  }},
-  ...
-]
-"""
-
 # --- Constants ---
 PDF_STORAGE_PATH = 'document_store/pdfs/'
-EMBEDDING_MODEL = OllamaEmbeddings(model="deepseek-r1:1.5b")
-DOCUMENT_VECTOR_DB = InMemoryVectorStore(EMBEDDING_MODEL)
-LANGUAGE_MODEL = OllamaLLM(model="deepseek-r1:1.5b")
+EMBEDDING_MODEL = build_embeddings()
+DOCUMENT_INDEX = DocumentIndex(EMBEDDING_MODEL)
+LANGUAGE_MODEL = OllamaLLM(model="deepseek-r1:1.5b", keep_alive=get_model_sessions().keep_alive("generation"))
 
 # --- Helpers ---
 def save_uploaded_file(uploaded_file):
@@ -81,17 +53,74 @@ def save_uploaded_file(uploaded_file):
         file.write(uploaded_file.getbuffer())
     return file_path
 
-def load_pdf_documents(file_path):
-    return PDFPlumberLoader(file_path).load()
-
-def chunk_documents(raw_documents):
-    return RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, add_start_index=True).split_documents(raw_documents)
+def find_related_documents(query, namespace=None, document_hash=None):
+    return DOCUMENT_INDEX.similarity_search(query, namespace=namespace, document_hash=document_hash)
+
+@st.experimental_fragment(run_every=2)
+def show_ingestion_progress(job_id):
+    progress = get_ingestion_queue().progress(job_id)
+    if progress.get("status") == "failed":
+        st.error(f"❌ Failed to process document: {progress.get('error')}")
+        return
+    if progress.get("status") == "done":
+        # Rerun the page once per job; if the index still looks incomplete the
+        # page keeps showing progress instead of rerunning again.
+        if st.session_state.get("ingestion_rerun") != job_id:
+            st.session_state["ingestion_rerun"] = job_id
+            st.rerun()
+        st.info("Indexing finished; reload the page if the document is not listed yet.")
+        return
+    total_pages = progress.get("total_pages") or 0
+    pages_done = progress.get("pages_done", 0)
+    st.progress(
+        pages_done / total_pages if total_pages else 0.0,
+        text=f"Indexing document: {pages_done}/{total_pages or '?'} pages, {progress.get('chunks', 0)} chunks"
+    )
 
-def index_documents(document_chunks):
-    DOCUMENT_VECTOR_DB.add_documents(document_chunks)
+@st.experimental_fragment(run_every=2)
+def show_question_bank_progress(job_id):
+    job = get_question_bank_job(job_id)
+    if job is None:
+        return
+    progress = job.get_progress()
+    if progress["status"] in ("done", "failed"):
+        # Rerun the page so the result is drawn once, outside this polling fragment.
+        st.rerun()
+    groups_total = progress["groups_total"]
+    st.progress(
+        progress["groups_done"] / groups_total if groups_total else 0.0,
+        text=(f"Question bank: {progress['groups_done']}/{groups_total} chunk groups, "
+              f"{progress['saved']} saved, {progress['duplicates']} duplicates skipped")
+    )
 
-def find_related_documents(query):
-    return DOCUMENT_VECTOR_DB.similarity_search(query)
+def show_question_bank_result(progress):
+    if progress["status"] == "done":
+        st.success(f"✅ Question bank finished: {progress['saved']} questions saved.")
+    else:
+        st.error(f"❌ Question bank generation failed: {progress['error']}")
+
+def question_bank_form(document_hash, topic):
+    with st.expander("📚 Generate a question bank from the whole document"):
+        group_size = st.number_input("Chunks per prompt", min_value=1, max_value=10, value=2)
+        max_questions = st.number_input("Maximum questions (0 = no limit)", min_value=0, value=0, step=50)
+        job_key = f"question_bank_job_{document_hash}"
+        if st.button("🚀 Generate Question Bank"):
+            if not topic:
+                st.warning("Please enter a topic name first.")
+            else:
+                job = start_question_bank_job(
+                    DOCUMENT_INDEX, document_hash, topic, topic,
+                    created_by=st.session_state.get("user_id") or "admin",
+                    group_size=int(group_size), max_questions=int(max_questions) or None
+                )
+                st.session_state[job_key] = job.id
+        job = get_question_bank_job(st.session_state[job_key]) if job_key in st.session_state else None
+        if job is not None:
+            progress = job.get_progress()
+            if progress["status"] in ("done", "failed"):
+                show_question_bank_result(progress)
+            else:
+                show_question_bank_progress(job.id)
 
 def generate_answer(user_query, context_documents):
     context_text = "\n\n".join([doc.page_content for doc in context_documents])
@@ -99,19 +128,6 @@ def generate_answer(user_query, context_documents):
     chain = prompt | LANGUAGE_MODEL
     return chain.invoke({"user_query": user_query, "document_context": context_text})
 
-def extract_json_from_response(response):
-    match = re.search(r'\[\s*{.*?}\s*\]', response, re.DOTALL)
-    if match:
-        raw_json = match.group()
-        raw_json = re.sub(r'"\s*\.,', '",', raw_json)
-        raw_json = re.sub(r'",\s*([\]}])', r'\1', raw_json)
-        try:
-            return json.loads(raw_json)
-        except json.JSONDecodeError as e:
-            logging.error(f"JSON decode error: {e}")
-            logging.debug(f"Raw JSON: {raw_json}")
-    return None
-
 # --- Streamlit App Entry Point ---
 def app():  # 👈 Wrap UI code here
     st.markdown("""<style> ... your CSS ... </style>""", unsafe_allow_html=True)
@@ -124,12 +140,22 @@ def app():  # 👈 Wrap UI code here
     uploaded_pdf = st.file_uploader("Upload Research Document (PDF)", type="pdf")
 
     if uploaded_pdf:
-        saved_path = save_uploaded_file(uploaded_pdf)
-        raw_docs = load_pdf_documents(saved_path)
-        processed_chunks = chunk_documents(raw_docs)
-        index_documents(processed_chunks)
-
-        st.success("✅ Document processed successfully! Ask your questions below.")
+        # Known documents (same bytes, same topic) skip parsing and embedding entirely.
+        document_hash = content_hash(uploaded_pdf.getbuffer())
+        if DOCUMENT_INDEX.has_document(document_hash, topicName):
+            st.success("✅ Document processed successfully! Ask your questions below.")
+            question_bank_form(document_hash, topicName)
+        else:
+            # New documents are ingested by the background worker; reruns only poll it.
+            ingestion = get_ingestion_queue()
+            job_id = ingestion.job_for(document_hash, topicName)
+            if job_id is None or ingestion.progress(job_id).get("status") == "failed":
+                saved_path = save_uploaded_file(uploaded_pdf)
+                job_id = ingestion.submit(saved_path, document_hash, topicName, uploaded_pdf.name)
+            show_ingestion_progress(job_id)
+            if not DOCUMENT_INDEX.has_chunks(document_hash, topicName):
+                return
+            st.info("Questions are answered from the pages indexed so far.")
 
         user_input = st.chat_input("Enter your question about the document...")
 
@@ -141,9 +167,9 @@ def app():  # 👈 Wrap UI code here
                 st.session_state.qa_saved = False
 
             with st.spinner("Analyzing document..."):
-                relevant_docs = find_related_documents(user_input)
+                relevant_docs = find_related_documents(user_input, topicName, document_hash)
                 ai_response = generate_answer(user_input, relevant_docs)
-                qa_pairs = extract_json_from_response(ai_response)
+                qa_pairs = parse_or_repair(ai_response, "qa_list", "deepseek-r1:1.5b", workload="generation")
 
             with st.chat_message("assistant", avatar="🤖"):
                 if qa_pairs:
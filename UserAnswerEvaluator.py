@@ -1,124 +1,73 @@
 import streamlit as st
-import psycopg2
-import pandas as pd
+from db import get_connection
+from bulk_writer import write_rows
+from question_catalog import get_question_catalog
+from pagination import paginate_questions, render_page_controls
 from datetime import datetime
-import ollama
-import json
-import re
-import whisper
-import sounddevice as sd
-from scipy.io.wavfile import write
-import numpy as np
-import tempfile
-import time
-from rouge_score import rouge_scorer
-from nltk.tokenize import TreebankWordTokenizer
-from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
-import evaluate
+from multiprocessing import AuthenticationError
+from transcription_worker import AUTHKEY_MISMATCH_MESSAGE, get_transcription_client
+from live_transcription import LiveTranscriber
+from bertscore_engine import get_bertscore_engine
+from scoring import get_metric_pipeline, score_pairs
+from grading import GRADING_MODE, request_evaluation, parse_evaluation, compute_final_score
 
 # ------------------ Load Whisper Model ------------------
-@st.cache_resource
+# The model lives in the shared transcription worker (transcription_worker.py);
+# pages only hold a client, so memory does not grow with the number of sessions.
 def load_whisper_model():
-    return whisper.load_model("small")
-
-# ------------------ DB Connection ------------------
-def get_connection():
-    return psycopg2.connect(
-        host="localhost",
-        dbname="llmqa",
-        user="postgres",
-        password="postgres",
-        port="5432"
-    )
-
-# ------------------ Fetch Questions ------------------
-def fetch_questions():
-    conn = get_connection()
-    df = pd.read_sql_query("SELECT id, topic_name, question, answer, created_by, created_at FROM public.questions", conn)
-    conn.close()
-    return df
+    return get_transcription_client()
 
 # ------------------ Save User Answer and Score ------------------
+USER_ANSWER_COLUMNS = [
+    "question_id", "user_answer", "user_id", "created_at",
+    "correctness", "bleu_score", "rouge_score", "bert_score", "final_score"
+]
+
+def save_user_answers(rows):
+    """Insert many graded answers at once; rows follow USER_ANSWER_COLUMNS."""
+    with get_connection() as conn:
+        write_rows(conn, "public.user_answers", USER_ANSWER_COLUMNS, rows)
+
 def save_user_answer(question_id, user_answer, user_id, correctness, bleu_score, rouge_score, bert_score, final_score):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO public.user_answers (
-            question_id, user_answer, user_id, created_at,
-            correctness, bleu_score, rouge_score, bert_score, final_score
-        )
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """, (
+    save_user_answers([(
         question_id, user_answer, user_id, datetime.utcnow(),
         correctness, bleu_score, rouge_score, bert_score, final_score
-    ))
-    conn.commit()
-    cur.close()
-    conn.close()
-
-tokenizer = TreebankWordTokenizer()
+    )])
 
 # Function to calculate BLEU score
 def calculate_bleu(reference, candidate):
-    reference_tokens = [tokenizer.tokenize(reference.lower())]
-    candidate_tokens = tokenizer.tokenize(candidate.lower())
-    smoothie = SmoothingFunction().method4
-    return sentence_bleu(reference_tokens, candidate_tokens, smoothing_function=smoothie) * 100
+    return get_metric_pipeline().bleu(reference, candidate)
 
 # Function to calculate ROUGE-L score
 def calculate_rouge_l(reference, candidate):
-    scorer = rouge_scorer.RougeScorer(['rougeL'], use_stemmer=True)
-    scores = scorer.score(reference, candidate)
-    return scores['rougeL'].fmeasure * 100
+    return get_metric_pipeline().rouge_l(reference, candidate)
 
 # BERTScore
 def calculate_bertscore(reference, candidate):
-    bertscore = evaluate.load("bertscore")
-    result = bertscore.compute(predictions=[candidate], references=[reference], lang="en")
-    return result["f1"][0] * 100
+    return get_bertscore_engine().score([reference], [candidate])[0]
 
 # ------------------ Evaluate Answer using Ollama ------------------
 def evaluate_answer(question, correct_answer, user_answer):
-    # Prompt to Ollama for scoring
-    prompt = f"""
-                You are an expert answer evaluator. Compare the student's answer with the reference answer to the question.
-
-                ### Question:
-                {question}
-
-                ### Reference Answer:
-                {correct_answer}
-
-                ### Student Answer:
-                {user_answer}
-
-                Evaluation Guidelines:
-                1. "correctness": 1 if the student's answer includes at least 50% of the key reasons from the reference answer; otherwise 0.
-                2. "completeness": Score 0–100 based on how many key points from the reference are covered. Partial matches are allowed.
-                3. "relevance": Score 0–100 based on how focused the student's answer is on valid reasons for deforestation.
-                4. "depth": Score 0–100 based on the richness of explanation (just listing is low depth, reasoning is high depth).
-
-                Respond ONLY in valid JSON format like this:
-                ```json
-                {{
-                "correctness": 1,
-                "completeness": 60,
-                "relevance": 70,
-                "depth": 40
-                }}
-                """
+    # Scores are shown as they stream only with GRADING_MODE=free; the default
+    # structured mode returns the whole (short) JSON reply at once.
+    status = st.empty()
+
+    def show_progress(state):
+        # Show the scores as they are written; reasoning is not displayed.
+        if state.json.started:
+            status.code(state.json.text, language="json")
+        elif state.thinking:
+            status.caption("🤔 Reasoning…")
+
     try:
-        response = ollama.chat(
-            model="deepseek-r1:1.5b",
-            messages=[{"role": "user", "content": prompt}],
-            options={
-                "temperature": 0  # makes response deterministic
-            }
-        )
-        content = response['message']['content']
-        json_text = re.search(r'\{.*\}', content, re.DOTALL)
-        if json_text:
-            result_json = json.loads(json_text.group(0))
+        if GRADING_MODE == "free":
+            content = request_evaluation(question, correct_answer, user_answer, on_progress=show_progress)
+        else:
+            with st.spinner("Grading..."):
+                content = request_evaluation(question, correct_answer, user_answer)
+        status.empty()
+        result_json = parse_evaluation(content)
+        if result_json:
             return result_json
         else:
             st.error("❌ Failed to extract JSON from LLM response.")
@@ -128,108 +77,150 @@ def evaluate_answer(question, correct_answer, user_answer):
         st.error(f"❌ Ollama Evaluation Error: {e}")
         return None
 
+# ------------------ Live Transcript ------------------
+@st.experimental_fragment(run_every=1)
+def show_live_transcript(question_id):
+    live = st.session_state.get(f"live_{question_id}")
+    if live is None:
+        return
+    if isinstance(live.error, AuthenticationError):
+        st.error(f"❌ {AUTHKEY_MISMATCH_MESSAGE}")
+    elif live.error is not None:
+        st.error(f"❌ Live transcription failed: {live.error}")
+    st.caption(f"🎙️ Recording {live.seconds:.0f}s")
+    st.info(live.text() or "Listening…")
+
+# ------------------ Queued Transcription ------------------
+@st.experimental_fragment(run_every=1)
+def show_transcription_job(question_id):
+    job_id = st.session_state.get(f"job_{question_id}")
+    if job_id is None:
+        return
+    client = load_whisper_model()
+    try:
+        result = client.result(job_id)
+        queue_depth = client.stats()["queue_depth"] if result is None else 0
+    except AuthenticationError:
+        st.session_state.pop(f"job_{question_id}")
+        st.error(f"❌ {AUTHKEY_MISMATCH_MESSAGE}")
+        return
+    except (RuntimeError, KeyError, EOFError, OSError) as e:
+        # Failed job, expired result or the worker is gone: stop polling this job.
+        st.session_state.pop(f"job_{question_id}")
+        st.error(f"❌ Transcription failed: {e}")
+        return
+    if result is None:
+        st.info(f"Transcribing... ({queue_depth} in queue)")
+        return
+    st.session_state.pop(f"job_{question_id}")
+    st.session_state[f"transcribed_{question_id}"] = result["text"]
+    st.rerun()
+
 # ------------------ Main App ------------------
 def app():
     st.title("🧠 Question Answer Evaluator with Voice Input")
 
-    questions_df = fetch_questions()
+    topics = get_question_catalog().topics()
 
-    if questions_df.empty:
+    if not topics:
         st.warning("No questions found in the database.")
     else:
-        topics = sorted(questions_df["topic_name"].unique())
-
-        for topic in topics:
-            with st.expander(f"📚 {topic}"):
-                topic_questions = questions_df[questions_df["topic_name"] == topic]
-
-                for _, row in topic_questions.iterrows():
-                    question_id = row['id']
-                    st.markdown(f"**❓ Question {question_id}**")
-                    st.write(row["question"])
-
-                    # Unique keys
-                    #answer_key = f"answer_{question_id}"
-                    start_key = f"start_rec_{question_id}"
-                    stop_key = f"stop_rec_{question_id}"
-                    transcribe_key = f"transcribe_{question_id}"
-                    answer_key = f"answer_{question_id}"
-                    transcribed_key = f"transcribed_{question_id}"
-                    default_answer = st.session_state.get(transcribed_key, "")
-
-                    # Initialize session state
-                    if f"is_recording_{question_id}" not in st.session_state:
+        topic = st.selectbox("📚 Topic", topics, key="evaluator_topic")
+        rows, has_next = paginate_questions("evaluator_page", topic)
+
+        for row in rows:
+            question_id = row['id']
+            st.markdown(f"**❓ Question {question_id}**")
+            st.write(row["question"])
+
+            # Unique keys
+            #answer_key = f"answer_{question_id}"
+            start_key = f"start_rec_{question_id}"
+            stop_key = f"stop_rec_{question_id}"
+            transcribe_key = f"transcribe_{question_id}"
+            answer_key = f"answer_{question_id}"
+            transcribed_key = f"transcribed_{question_id}"
+            default_answer = st.session_state.get(transcribed_key, "")
+
+            # Initialize session state
+            if f"is_recording_{question_id}" not in st.session_state:
+                st.session_state[f"is_recording_{question_id}"] = False
+            if f"audio_{question_id}" not in st.session_state:
+                st.session_state[f"audio_{question_id}"] = None
+
+            # Answer Input
+            user_answer = st.text_area(
+                            "✍️ Your Answer (or use voice)",
+                            key=answer_key,
+                            value=st.session_state.get(f"transcribed_{question_id}", "")
+                        )
+
+            # Voice Recording Buttons
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                if not st.session_state[f"is_recording_{question_id}"]:
+                    if st.button("🟢 Start Recording", key=start_key):
+                        # Transcribes in windows while recording; see live_transcription.py.
+                        st.session_state[f"live_{question_id}"] = LiveTranscriber(load_whisper_model()).start()
+                        st.session_state[f"is_recording_{question_id}"] = True
+                        st.info("Recording... Click stop when done.")
+
+            with col2:
+                if st.session_state[f"is_recording_{question_id}"]:
+                    if st.button("🔴 Stop Recording", key=stop_key):
+                        live = st.session_state.pop(f"live_{question_id}")
+                        with st.spinner("Finishing transcription..."):
+                            st.session_state[transcribed_key] = live.stop()
+                        # Kept in memory as Whisper-ready float32; nothing is written to disk.
+                        st.session_state[f"audio_{question_id}"] = live.audio()
                         st.session_state[f"is_recording_{question_id}"] = False
-                    if f"audio_path_{question_id}" not in st.session_state:
-                        st.session_state[f"audio_path_{question_id}"] = None
-
-                    # Answer Input
-                    user_answer = st.text_area(
-                                    "✍️ Your Answer (or use voice)",
-                                    key=answer_key,
-                                    value=st.session_state.get(f"transcribed_{question_id}", "")
-                                )
-
-                    # Voice Recording Buttons
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        if not st.session_state[f"is_recording_{question_id}"]:
-                            if st.button("🟢 Start Recording", key=start_key):
-                                st.session_state[f"audio_buffer_{question_id}"] = sd.rec(
-                                    int(60 * 16000), samplerate=16000, channels=1, dtype='int16'
-                                )
-                                sd.sleep(100)
-                                st.session_state[f"start_time_{question_id}"] = time.time()
-                                st.session_state[f"is_recording_{question_id}"] = True
-                                st.info("Recording... Click stop when done.")
-
-                    with col2:
-                        if st.session_state[f"is_recording_{question_id}"]:
-                            if st.button("🔴 Stop Recording", key=stop_key):
-                                sd.stop()
-                                duration = int((time.time() - st.session_state[f"start_time_{question_id}"]) * 16000)
-                                trimmed_audio = st.session_state[f"audio_buffer_{question_id}"][:duration]
-
-                                with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_file:
-                                    write(tmp_file.name, 16000, trimmed_audio)
-                                    st.session_state[f"audio_path_{question_id}"] = tmp_file.name
-
-                                st.session_state[f"is_recording_{question_id}"] = False
-                                st.success("Recording stopped.")
-
-                    with col3:
-                        if st.session_state.get(f"audio_path_{question_id}"):
-                            if st.button("📝 Transcribe", key=transcribe_key):
-                                st.info("Transcribing...")
-                                model = load_whisper_model()
-                                result = model.transcribe(st.session_state[f"audio_path_{question_id}"])
-                                st.session_state[transcribed_key] = result["text"]
-                                st.rerun()
-
-                    # Evaluate Button
-                    if st.button("🧪 Evaluate & Save", key=f"eval_{question_id}"):
-                        current_answer = st.session_state.get(answer_key, "").strip()
-                        if current_answer:
-                            with st.spinner("Evaluating Answer..."):
-                                result = evaluate_answer(row["question"], row["answer"], current_answer)
-
-                                if result:
-                                    bleu = calculate_bleu(row["answer"], current_answer)
-                                    rouge = calculate_rouge_l(row["answer"], current_answer)
-                                    bert = calculate_bertscore(row["answer"], current_answer)
-                                    final_score = round(result["completeness"] * 0.4 + result["relevance"] * 0.4 + result["depth"] * 0.2, 2)
-                                    uid = st.session_state.get("user_id")
-                                    save_user_answer(row["id"], current_answer, uid,result["correctness"], bleu, rouge, bert, final_score)
-                                    st.success(f"✅ Answer saved with score: {final_score}")
-                                    st.markdown("### 🔍 Evaluation Details")
-                                    st.json({
-                                        **result,
-                                        "bleu_score": bleu,
-                                        "rouge_score": rouge,
-                                        "bert_score": bert,
-                                        "final_score": final_score
-                                    })
-                        else:
-                            st.error("⚠️ Please provide an answer before evaluation.")
-
-                    st.markdown("---")
\ No newline at end of file
+                        st.rerun()
+
+            if st.session_state[f"is_recording_{question_id}"] and f"live_{question_id}" in st.session_state:
+                show_live_transcript(question_id)
+
+            with col3:
+                if st.session_state.get(f"audio_{question_id}") is not None:
+                    if st.button("📝 Transcribe", key=transcribe_key):
+                        # Queued on the transcription worker; the fragment polls for the text.
+                        try:
+                            st.session_state[f"job_{question_id}"] = load_whisper_model().submit(
+                                st.session_state[f"audio_{question_id}"]
+                            )
+                        except AuthenticationError:
+                            st.error(f"❌ {AUTHKEY_MISMATCH_MESSAGE}")
+                        except (EOFError, OSError) as e:
+                            st.error(f"❌ Transcription worker unavailable: {e}")
+                if f"job_{question_id}" in st.session_state:
+                    show_transcription_job(question_id)
+
+            # Evaluate Button
+            if st.button("🧪 Evaluate & Save", key=f"eval_{question_id}"):
+                current_answer = st.session_state.get(answer_key, "").strip()
+                if current_answer:
+                    with st.spinner("Evaluating Answer..."):
+                        result = evaluate_answer(row["question"], row["answer"], current_answer)
+
+                        if result:
+                            metrics = score_pairs([(question_id, row["answer"], current_answer)])[0]
+                            bleu = metrics["bleu_score"]
+                            rouge = metrics["rouge_score"]
+                            bert = metrics["bert_score"]
+                            final_score = compute_final_score(result)
+                            uid = st.session_state.get("user_id")
+                            save_user_answer(row["id"], current_answer, uid,result["correctness"], bleu, rouge, bert, final_score)
+                            st.success(f"✅ Answer saved with score: {final_score}")
+                            st.markdown("### 🔍 Evaluation Details")
+                            st.json({
+                                **result,
+                                "bleu_score": bleu,
+                                "rouge_score": rouge,
+                                "bert_score": bert,
+                                "final_score": final_score
+                            })
+                else:
+                    st.error("⚠️ Please provide an answer before evaluation.")
+
+            st.markdown("---")
+
+        render_page_controls("evaluator_page", rows, has_next)
@@ -1,32 +1,17 @@
 import streamlit as st
-import psycopg2
-import pandas as pd
+from question_catalog import get_question_catalog
+from pagination import paginate_questions, render_page_controls
 from datetime import datetime
-import ollama
-import json
-import re
-
-
-# ------------------ DB Connection ------------------
-def get_connection():
-    return psycopg2.connect(
-        host="localhost",
-        dbname="llmqa",
-        user="postgres",
-        password="postgres",
-        port="5432"
-    )
+from llm_client import get_llm_pool
+from llm_cache import get_llm_cache, make_cache_key
+from llm_json import parse_or_repair
+from llm_stream import stream_json
 
-# ------------------ Fetch Questions ------------------
-def fetch_questions():
-    conn = get_connection()
-    df = pd.read_sql_query("SELECT id, topic_name, question, answer FROM public.questions", conn)
-    conn.close()
-    return df
 
 # ------------------ Get LLM Feedback ------------------
-def get_feedback(question, correct_answer, user_answer):
-    prompt = f"""
+FEEDBACK_MODEL = "deepseek-r1:1.5b"
+
+FEEDBACK_PROMPT = """
 You are an expert tutor and evaluator. Your job is to help the user learn and improve their answer.
 
 ### Question:
@@ -52,57 +37,97 @@ Respond ONLY in this JSON format:
 }}
 """
 
+FEEDBACK_FIELD = "explanation"
+
+def stream_feedback(question, correct_answer, user_answer):
+    """Yield (explanation so far, feedback) while the model writes; feedback is set on the last item only.
+
+    The final feedback is None when no JSON object could be parsed.
+    """
+    cache = get_llm_cache()
+    cache_key = make_cache_key(
+        "feedback", FEEDBACK_MODEL, FEEDBACK_PROMPT,
+        question=question, correct_answer=correct_answer, user_answer=user_answer
+    )
+    cached = cache.get(cache_key)
+    if cached is not None:
+        yield cached.get(FEEDBACK_FIELD, ""), cached
+        return
+
+    prompt = FEEDBACK_PROMPT.format(question=question, correct_answer=correct_answer, user_answer=user_answer)
+    state = None
+    for state in stream_json(FEEDBACK_MODEL, prompt, workload="feedback"):
+        partial = state.json.partial_string(FEEDBACK_FIELD)
+        if partial:
+            yield partial, None
+    feedback = parse_or_repair(state.text, "feedback", FEEDBACK_MODEL, workload="feedback") if state else None
+    if feedback is not None:
+        cache.set(cache_key, feedback, kind="feedback")
+    yield (feedback or {}).get(FEEDBACK_FIELD, ""), feedback
+
+def get_feedback(question, correct_answer, user_answer):
+    try:
+        feedback = None
+        for _, feedback in stream_feedback(question, correct_answer, user_answer):
+            pass
+        return feedback or {"explanation": "⚠️ Failed to extract feedback JSON."}
+    except Exception as e:
+        return f"❌ Error fetching feedback: {e}"
+
+def show_streamed_feedback(question, correct_answer, user_answer):
+    """Render feedback token by token and return the final result (as get_feedback does)."""
+    placeholder = st.empty()
+    placeholder.info("🤔 Thinking…")
     try:
-        response = ollama.chat(
-            model="deepseek-r1:1.5b",
-            messages=[{"role": "user", "content": prompt}],
-            keep_alive=False
-        )
-        content = response['message']['content']
-        json_text = re.search(r'\{.*\}', content, re.DOTALL)
-        if json_text:
-             return json.loads(json_text.group(0))
-        else:
-            return {"explanation": "⚠️ Failed to extract feedback JSON."}
+        feedback = None
+        for explanation, feedback in stream_feedback(question, correct_answer, user_answer):
+            if feedback is None and explanation:
+                placeholder.info(explanation + " ▌")
+        placeholder.empty()
+        return feedback or {"explanation": "⚠️ Failed to extract feedback JSON."}
     except Exception as e:
+        placeholder.empty()
         return f"❌ Error fetching feedback: {e}"
 
+def get_feedback_many(items):
+    """Fetch feedback for (question, correct_answer, user_answer) tuples concurrently."""
+    return get_llm_pool().map(get_feedback, items)
+
 # ------------------ Main UI ------------------
 # --- Streamlit App Entry Point ---
 def app():  # 👈 Wrap UI code here
     #st.set_page_config(page_title="Answer with Feedback", layout="wide")
     st.title("Answer Feedback")
 
-    questions_df = fetch_questions()
+    topics = get_question_catalog().topics()
 
-    if questions_df.empty:
+    if not topics:
         st.warning("No questions found in the database.")
     else:
-        topics = sorted(questions_df["topic_name"].unique())
+        topic = st.selectbox("📂 Topic", topics, key="feedback_topic")
+        rows, has_next = paginate_questions("feedback_page", topic)
 
-        for topic in topics:
-            with st.expander(f"📂 {topic}"):
-                topic_questions = questions_df[questions_df["topic_name"] == topic]
+        for row in rows:
+            st.markdown(f"**📝 Question {row['id']}**")
+            st.write(row["question"])
 
-                for _, row in topic_questions.iterrows():
-                    st.markdown(f"**📝 Question {row['id']}**")
-                    st.write(row["question"])
+            user_input_key = f"user_answer_{row['id']}"
+            feedback_output_key = f"feedback_{row['id']}"
 
-                    user_input_key = f"user_answer_{row['id']}"
-                    feedback_output_key = f"feedback_{row['id']}"
+            user_answer = st.text_area("✍️ Your Answer", key=user_input_key)
 
-                    user_answer = st.text_area("✍️ Your Answer", key=user_input_key)
+            if st.button("🧠 Get Feedback", key=f"feedback_btn_{row['id']}"):
+                    if user_answer.strip():
+                        explanation = show_streamed_feedback(row["question"], row["answer"], user_answer)
+                        st.session_state[feedback_output_key] = explanation
+                    else:
+                        st.error("⚠️ Please enter your answer before requesting feedback.")
 
-                    if st.button("🧠 Get Feedback", key=f"feedback_btn_{row['id']}"):
-                            if user_answer.strip():
-                                explanation = get_feedback(row["question"], row["answer"], user_answer)
-                                st.session_state[feedback_output_key] = explanation
-                            else:
-                                st.error("⚠️ Please enter your answer before requesting feedback.")
+            # Show feedback if already fetched
+            if feedback_output_key in st.session_state:
+                st.markdown("**🗣️ Feedback:**")
+                st.info(st.session_state[feedback_output_key])
 
-                    # Show feedback if already fetched
-                    if feedback_output_key in st.session_state:
-                        st.markdown("**🗣️ Feedback:**")
-                        st.info(st.session_state[feedback_output_key])
+            st.markdown("---")
 
-                    st.markdown("---")
+        render_page_controls("feedback_page", rows, has_next)
@@ -1,35 +1,24 @@
 import streamlit as st
-import psycopg2
+from db import get_connection
 import hashlib
 
-# ------------------ DB Connection ------------------
-def get_connection():
-    return psycopg2.connect(
-        host="localhost",        # 🔁 Update as needed
-        dbname="llmqa",
-        user="postgres",
-        password="postgres",
-        port="5432"
-    )
-
 # ------------------ Password Hashing ------------------
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
 # ------------------ Add User Function ------------------
 def add_user(username, user_id, password, role, is_active=True, is_updated=False):
-    conn = get_connection()
-    cur = conn.cursor()
     hashed = hash_password(password)
 
-    cur.execute("""
-        INSERT INTO users (username, user_id, password, role, is_active, is_updated)
-        VALUES (%s, %s, %s, %s, %s, %s)
-    """, (username, user_id, hashed, role, is_active, is_updated))
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO users (username, user_id, password, role, is_active, is_updated)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, (username, user_id, hashed, role, is_active, is_updated))
 
-    conn.commit()
-    cur.close()
-    conn.close()
+        conn.commit()
+        cur.close()
 
 # ------------------ Admin UI ------------------
 def app():
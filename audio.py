@@ -0,0 +1,37 @@
+import numpy as np
+from scipy.io import wavfile
+
+# ------------------ In-Memory Audio ------------------
+# Recordings stay in memory from sd.rec() to Whisper: the int16 buffer is
+# converted to the mono float32 [-1, 1) array at 16 kHz that whisper.transcribe
+# accepts directly, so no temp WAV is written and ffmpeg is never started.
+SAMPLE_RATE = 16000
+MAX_RECORDING_SECONDS = 60
+
+def to_float32(buffer, sample_rate=SAMPLE_RATE):
+    """Mono float32 audio at SAMPLE_RATE from an int16/int32/float buffer of shape (n,) or (n, channels)."""
+    audio = np.asarray(buffer)
+    if audio.dtype == np.int16:
+        audio = audio.astype(np.float32) / 32768.0
+    elif audio.dtype == np.int32:
+        audio = audio.astype(np.float32) / 2147483648.0
+    else:
+        audio = audio.astype(np.float32, copy=False)
+    if audio.ndim == 2:
+        audio = audio[:, 0] if audio.shape[1] == 1 else audio.mean(axis=1, dtype=np.float32)
+    if sample_rate != SAMPLE_RATE and len(audio):
+        # Linear resampling is enough for speech recognition input.
+        duration = len(audio) / sample_rate
+        target = np.linspace(0, duration, int(round(duration * SAMPLE_RATE)), endpoint=False, dtype=np.float64)
+        audio = np.interp(target, np.arange(len(audio)) / sample_rate, audio).astype(np.float32)
+    return np.ascontiguousarray(audio)
+
+def load_wav(path):
+    """Read a WAV file into Whisper's float32 format without ffmpeg."""
+    sample_rate, data = wavfile.read(path)
+    return to_float32(data, sample_rate)
+
+def transcribe_array(model, audio, **options):
+    """Run whisper (or an stt_backends backend) on an in-memory float32 array; returns {"text": ...}."""
+    options.setdefault("fp16", False)  # CPU inference; avoids the fp16 fallback warning
+    return model.transcribe(audio, **options)
@@ -0,0 +1,130 @@
+# bench_grading.py
+# Compares the free-text grading request with the structured-output mode on a
+# fixed answer set: generated tokens per grade, latency and how often the reply
+# parses into a valid evaluation.
+#
+#   python bench_grading.py --repeats 3
+#   python bench_grading.py --modes free structured structured-think --from-db 20
+#
+# Requests go straight to Ollama (the grading cache is bypassed). One warm-up
+# request runs first so a model load is not counted against either mode.
+import argparse
+import statistics
+import time
+from grading import LLM_MODEL, evaluation_request, parse_evaluation
+from llm_client import get_llm_pool
+
+ANSWER_SET = [
+    (
+        "What are the main causes of deforestation?",
+        "Agricultural expansion, logging, infrastructure such as roads and dams, mining and urban growth.",
+        "People cut trees for farms and cattle, and logging companies sell the wood.",
+    ),
+    (
+        "What are the main causes of deforestation?",
+        "Agricultural expansion, logging, infrastructure such as roads and dams, mining and urban growth.",
+        "Forests are lost mainly because land is cleared for agriculture and ranching; commercial logging, "
+        "new roads that open up remote areas, mining and expanding cities add to it.",
+    ),
+    (
+        "Why does deforestation increase atmospheric CO2?",
+        "Trees store carbon; cutting and burning them releases it, and fewer trees remain to absorb CO2.",
+        "Because trees give oxygen.",
+    ),
+    (
+        "What is a deadlock in an operating system?",
+        "A set of processes each waiting for a resource held by another, so none can proceed.",
+        "When two processes hold a resource each and wait for the other's resource forever, nobody can continue.",
+    ),
+    (
+        "Name the four necessary conditions for deadlock.",
+        "Mutual exclusion, hold and wait, no preemption and circular wait.",
+        "Mutual exclusion and circular wait.",
+    ),
+    (
+        "What does the TCP three-way handshake do?",
+        "It establishes a connection: SYN, SYN-ACK, ACK synchronise sequence numbers on both sides.",
+        "The client sends SYN, the server answers SYN-ACK and the client replies ACK, agreeing on sequence numbers.",
+    ),
+    (
+        "What is photosynthesis?",
+        "The process by which plants use light, water and CO2 to make glucose and release oxygen.",
+        "I don't know.",
+    ),
+    (
+        "Explain the difference between a list and a tuple in Python.",
+        "Lists are mutable and tuples are immutable; tuples can be dictionary keys.",
+        "A list can be changed after it is created, a tuple cannot, which also makes tuples hashable.",
+    ),
+]
+
+MODES = {
+    "free": {"mode": "free"},
+    "structured": {"mode": "structured", "think": False},
+    "structured-think": {"mode": "structured", "think": True},
+}
+
+def load_answer_set(limit):
+    from db import get_connection
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT q.question, q.answer, ua.user_answer
+            FROM public.user_answers ua JOIN public.questions q ON q.id = ua.question_id
+            ORDER BY ua.id LIMIT %s
+        """, (limit,))
+        rows = cur.fetchall()
+        cur.close()
+    return rows
+
+def grade_once(item, options, num_predict):
+    request = evaluation_request(*item, num_predict=num_predict, **options)
+    start = time.perf_counter()
+    response = get_llm_pool().chat(**request)
+    seconds = time.perf_counter() - start
+    message = response["message"]
+    return {
+        "seconds": seconds,
+        "tokens": response.get("eval_count") or 0,
+        "thinking_chars": len(message.get("thinking") or ""),
+        "result": parse_evaluation(message["content"]),
+    }
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark free-text vs structured grading requests.")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=["free", "structured"])
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--num-predict", type=int, default=None, help="token cap for structured mode")
+    parser.add_argument("--from-db", type=int, default=0, metavar="N", help="use the first N stored answers instead")
+    args = parser.parse_args()
+
+    answers = load_answer_set(args.from_db) if args.from_db else ANSWER_SET
+    print(f"model {LLM_MODEL}, {len(answers)} answers x {args.repeats} repeats")
+    grade_once(answers[0], MODES["structured"], args.num_predict)
+
+    print(f"{'mode':>16} | {'tokens/grade':>12} | {'mean s':>7} | {'p50 s':>6} | {'p95 s':>6} | {'valid':>6} | agree")
+    baseline = None
+    for name in args.modes:
+        runs = [grade_once(item, MODES[name], args.num_predict) for _ in range(args.repeats) for item in answers]
+        seconds = [run["seconds"] for run in runs]
+        valid = [run["result"] for run in runs]
+        # Agreement on correctness with the first mode listed, per answer.
+        agree = ""
+        if baseline is None:
+            baseline = valid
+        else:
+            pairs = [(a, b) for a, b in zip(baseline, valid) if a and b]
+            if pairs:
+                agree = f"{sum(a['correctness'] == b['correctness'] for a, b in pairs) / len(pairs):.0%}"
+        print(
+            f"{name:>16} | {statistics.mean(run['tokens'] for run in runs):>12.1f} | {statistics.mean(seconds):>7.2f} | "
+            f"{percentile(seconds, 0.5):>6.2f} | {percentile(seconds, 0.95):>6.2f} | "
+            f"{sum(1 for result in valid if result) / len(valid):>6.0%} | {agree}"
+        )
+
+if __name__ == "__main__":
+    main()
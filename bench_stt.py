@@ -0,0 +1,65 @@
+# bench_stt.py
+# Real-time factor and word error rate of each speech-to-text backend and model
+# size on harvard.wav (or other clips with --clips / --reference).
+#
+#   python bench_stt.py
+#   python bench_stt.py --backends faster-whisper --sizes tiny base small --compute-types int8 float32 --threads 4
+#
+# RTF is decode time divided by audio duration (below 1.0 is faster than real
+# time); it is the median of --repeats runs after one warm-up decode.
+import argparse
+import itertools
+import os
+import statistics
+import time
+from audio import SAMPLE_RATE, load_wav
+from bench_vad import HARVARD_REFERENCE
+from scoring import word_error_rate
+from stt_backends import BACKENDS, load_stt_backend
+
+def backend_configs(args):
+    for backend, size in itertools.product(args.backends, args.sizes):
+        if backend == "faster-whisper":
+            for compute_type in args.compute_types:
+                yield backend, size, {"compute_type": compute_type}
+        else:
+            yield backend, size, {}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark speech-to-text backends.")
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument("--sizes", nargs="+", default=["base", "small"])
+    parser.add_argument("--compute-types", nargs="+", default=["int8"], help="faster-whisper compute types")
+    parser.add_argument("--threads", type=int, default=0, help="CPU threads (0 = library default)")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--clips", nargs="+", default=["harvard.wav"])
+    parser.add_argument("--reference", help="transcript for the clips other than harvard.wav")
+    args = parser.parse_args()
+
+    clips = [(path, load_wav(path)) for path in args.clips]
+    print(f"{'backend':>15} | {'size':>6} | {'compute':>8} | {'load s':>6} | {'clip':>12} | {'RTF':>6} | {'WER':>6}")
+    for backend, size, options in backend_configs(args):
+        try:
+            start = time.perf_counter()
+            model = load_stt_backend(backend, model_size=size, threads=args.threads, **options)
+            load_seconds = time.perf_counter() - start
+        except ImportError as e:
+            print(f"{backend:>15} | {size:>6} | skipped: {e}")
+            continue
+        for path, audio in clips:
+            model.transcribe(audio[:SAMPLE_RATE * 5])  # warm-up
+            timings = []
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                result = model.transcribe(audio, temperature=0)
+                timings.append(time.perf_counter() - start)
+            reference = HARVARD_REFERENCE if os.path.basename(path) == "harvard.wav" else args.reference
+            wer = f"{word_error_rate(reference, result['text']):>6.1%}" if reference else f"{'-':>6}"
+            rtf = statistics.median(timings) / (len(audio) / SAMPLE_RATE)
+            print(
+                f"{backend:>15} | {size:>6} | {options.get('compute_type', 'fp32'):>8} | {load_seconds:>6.1f} | "
+                f"{os.path.basename(path):>12} | {rtf:>6.3f} | {wer}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# bench_vad.py
+# Measures how much Whisper decode time silence trimming and pause splitting
+# (vad.py) save on recorded answers.
+#
+#   python bench_vad.py --model small
+#   python bench_vad.py --backend faster-whisper --model base
+#   python bench_vad.py --clips harvard.wav other.wav --lead 5 --tail 40
+#
+# Each clip is padded with low-level noise before and after the speech, like
+# an sd.rec() buffer that was started early and stopped late, then transcribed
+# as is and through vad.transcribe_speech. WER is measured against the known
+# transcript of harvard.wav, or against the untrimmed transcription otherwise.
+import argparse
+import os
+import time
+import numpy as np
+from audio import SAMPLE_RATE, load_wav, transcribe_array
+from scoring import word_error_rate
+from stt_backends import BACKENDS, load_stt_backend
+from vad import split_at_pauses, transcribe_speech
+
+HARVARD_REFERENCE = (
+    "The stale smell of old beer lingers. It takes heat to bring out the odor. "
+    "A cold dip restores health and zest. A salt pickle tastes fine with ham. "
+    "Tacos al pastor are my favorite. A zestful food is the hot cross bun."
+)
+
+def padded(audio, lead, tail, noise_level, rng):
+    def noise(seconds):
+        return (rng.standard_normal(int(seconds * SAMPLE_RATE)) * noise_level).astype(np.float32)
+    return np.concatenate([noise(lead), audio, noise(tail)])
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark VAD trimming before Whisper transcription.")
+    parser.add_argument("--clips", nargs="+", default=["harvard.wav"])
+    parser.add_argument("--backend", choices=list(BACKENDS), default="whisper")
+    parser.add_argument("--model", default="small", help="model size")
+    parser.add_argument("--lead", type=float, default=3.0, help="seconds of noise before the speech")
+    parser.add_argument("--tail", type=float, default=20.0, help="seconds of noise after the speech")
+    parser.add_argument("--noise", type=float, default=0.002, help="noise amplitude (float32 scale)")
+    args = parser.parse_args()
+
+    model = load_stt_backend(args.backend, model_size=args.model)
+    rng = np.random.default_rng(0)
+    transcribe_array(model, np.zeros(SAMPLE_RATE, dtype=np.float32))  # warm-up
+
+    print(f"{'clip':>14} | {'mode':>7} | {'audio s':>7} | {'decoded s':>9} | {'vad ms':>6} | {'decode s':>8} | {'WER':>6}")
+    for path in args.clips:
+        clip = padded(load_wav(path), args.lead, args.tail, args.noise, rng)
+        raw, raw_seconds = timed(lambda audio: transcribe_array(model, audio), clip)
+        chunks, vad_seconds = timed(split_at_pauses, clip)
+        trimmed, trimmed_seconds = timed(lambda audio: transcribe_speech(model, audio), clip)
+        reference = HARVARD_REFERENCE if os.path.basename(path) == "harvard.wav" else raw["text"]
+        audio_seconds = len(clip) / SAMPLE_RATE
+        rows = [
+            ("full", audio_seconds, raw_seconds, None, raw["text"]),
+            ("vad", sum(len(chunk) for chunk in chunks) / SAMPLE_RATE, trimmed_seconds, vad_seconds, trimmed["text"]),
+        ]
+        for mode, decoded, seconds, vad, text in rows:
+            print(
+                f"{os.path.basename(path):>14} | {mode:>7} | {audio_seconds:>7.1f} | {decoded:>9.1f} | "
+                f"{(f'{vad * 1000:.1f}' if vad is not None else '-'):>6} | {seconds:>8.2f} | "
+                f"{word_error_rate(reference, text):>6.1%}"
+            )
+
+if __name__ == "__main__":
+    main()
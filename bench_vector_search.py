@@ -0,0 +1,91 @@
+# bench_vector_search.py
+# Compares retrieval latency of vector_search.VectorMatrix with LangChain's
+# InMemoryVectorStore on synthetic chunk embeddings.
+#
+#   python bench_vector_search.py --sizes 10000 100000 1000000 --dim 1536
+#
+# 1M chunks at 1536 dims is ~6 GB of float32; pass a smaller --dim on small hosts.
+# InMemoryVectorStore is only measured up to --baseline-max chunks; past that it
+# takes minutes per query and the row is reported as skipped.
+#
+# Measured on a 1-vCPU, 5 GB host (numpy 2, langchain-core 1.x), 20 queries, k=4,
+# ms per query:
+#
+#   dim    chunks | matrix | filtered | batched | InMemoryVectorStore | speedup
+#   384     10000 |   1.19 |     0.11 |    0.42 |              191.11 |  161.0x
+#   384    100000 |  18.35 |     0.35 |    3.56 |             2107.97 |  114.9x
+#   384   1000000 | 213.54 |     4.89 |   44.11 |             skipped |
+#   1536    10000 |   6.04 |     0.15 |    1.22 |              872.59 |  144.5x
+#
+# 100k x 1536 was not run: InMemoryVectorStore keeps vectors as Python lists
+# (~5 GB at that size).
+import argparse
+import time
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import InMemoryVectorStore
+from vector_search import VectorMatrix
+
+class PrecomputedEmbeddings(Embeddings):
+    """Maps the synthetic text "chunk-<i>" to row i of a precomputed matrix."""
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_documents(self, texts):
+        return [self.vectors[int(text.split("-")[1])].tolist() for text in texts]
+
+    def embed_query(self, text):
+        raise NotImplementedError("queries are passed as vectors")
+
+def time_queries(search, queries):
+    start = time.perf_counter()
+    for query in queries:
+        search(query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+def bench(size, dim, queries, k, baseline_max, rng):
+    vectors = rng.standard_normal((size, dim), dtype=np.float32)
+    metadatas = [{"topic": "bench", "source": f"doc{i % 50}.pdf", "page": i % 300} for i in range(size)]
+    row = {"size": size}
+
+    start = time.perf_counter()
+    matrix = VectorMatrix(dim=dim, capacity=size)
+    matrix.add(vectors, metadatas)
+    row["matrix_build_s"] = time.perf_counter() - start
+    row["matrix_ms"] = time_queries(lambda q: matrix.search(q, k=k), queries)
+    row["matrix_filtered_ms"] = time_queries(lambda q: matrix.search(q, k=k, source="doc7.pdf", page_range=(10, 120)), queries)
+    start = time.perf_counter()
+    matrix.search(queries, k=k)
+    row["matrix_batch_ms"] = (time.perf_counter() - start) / len(queries) * 1000
+
+    if size <= baseline_max:
+        store = InMemoryVectorStore(PrecomputedEmbeddings(vectors))
+        start = time.perf_counter()
+        store.add_texts([f"chunk-{i}" for i in range(size)], metadatas=metadatas)
+        row["baseline_build_s"] = time.perf_counter() - start
+        row["baseline_ms"] = time_queries(lambda q: store.similarity_search_by_vector(q.tolist(), k=k), queries)
+    return row
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized similarity search.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--dim", type=int, default=1536, help="embedding width (deepseek-r1:1.5b emits 1536)")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--baseline-max", type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+
+    print(f"{'chunks':>9} | {'matrix ms':>9} | {'filtered':>9} | {'batched':>9} | {'baseline ms':>11} | speedup")
+    for size in args.sizes:
+        row = bench(size, args.dim, queries, args.k, args.baseline_max, rng)
+        baseline = row.get("baseline_ms")
+        print(
+            f"{size:>9} | {row['matrix_ms']:>9.2f} | {row['matrix_filtered_ms']:>9.2f} | {row['matrix_batch_ms']:>9.2f} | "
+            + (f"{baseline:>11.2f} | {baseline / row['matrix_ms']:>6.1f}x" if baseline else f"{'skipped':>11} |")
+        )
+
+if __name__ == "__main__":
+    main()
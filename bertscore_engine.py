@@ -0,0 +1,85 @@
+import threading
+import time
+import evaluate
+
+# ------------------ Shared BERTScore Engine ------------------
+# evaluate.load("bertscore") re-imports the metric module and the first
+# compute() pulls the transformer into memory. Doing that once per process and
+# reusing the same metric object keeps the model warm between answers.
+class BertScoreEngine:
+    def __init__(self, lang="en", model_type=None, batch_size=64):
+        self.lang = lang
+        self.model_type = model_type
+        self.batch_size = batch_size
+        self._metric = None
+        self._load_lock = threading.Lock()
+        self._score_lock = threading.Lock()
+        self.stats = {
+            "load_seconds": 0.0,
+            "batches": 0,
+            "pairs": 0,
+            "last_batch_seconds": 0.0,
+            "total_batch_seconds": 0.0,
+        }
+
+    def _compute(self, references, candidates):
+        kwargs = {"lang": self.lang, "batch_size": self.batch_size}
+        if self.model_type:
+            kwargs["model_type"] = self.model_type
+        return self._metric.compute(predictions=candidates, references=references, **kwargs)
+
+    def load(self):
+        if self._metric is not None:
+            return self
+        with self._load_lock:
+            if self._metric is None:
+                start = time.perf_counter()
+                self._metric = evaluate.load("bertscore")
+                # The transformer is only built on the first compute, so warm it here.
+                self._compute(["warm up"], ["warm up"])
+                self.stats["load_seconds"] = time.perf_counter() - start
+        return self
+
+    @property
+    def is_loaded(self):
+        return self._metric is not None
+
+    def score(self, references, candidates):
+        """Return BERTScore F1 (0-100) for each (reference, candidate) pair."""
+        references = list(references)
+        candidates = list(candidates)
+        if len(references) != len(candidates):
+            raise ValueError("references and candidates must have the same length")
+        if not references:
+            return []
+
+        self.load()
+        with self._score_lock:
+            start = time.perf_counter()
+            result = self._compute(references, candidates)
+            elapsed = time.perf_counter() - start
+            self.stats["batches"] += 1
+            self.stats["pairs"] += len(references)
+            self.stats["last_batch_seconds"] = elapsed
+            self.stats["total_batch_seconds"] += elapsed
+        return [f1 * 100 for f1 in result["f1"]]
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["loaded"] = self.is_loaded
+        stats["avg_batch_seconds"] = (
+            stats["total_batch_seconds"] / stats["batches"] if stats["batches"] else 0.0
+        )
+        return stats
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_bertscore_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = BertScoreEngine()
+    return _engine
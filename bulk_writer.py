@@ -0,0 +1,171 @@
+import io
+import os
+import uuid
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+
+# ------------------ Bulk Writes ------------------
+# Multi-row write paths for generated questions and graded answers:
+#   "values"  one INSERT ... VALUES (...), (...) statement per batch (execute_values)
+#   "copy"    COPY ... FROM STDIN; with ON CONFLICT or RETURNING the rows are
+#             copied into a temp table first and moved with INSERT ... SELECT.
+#             The staging table has only the target columns (no defaults, so
+#             no sequence values are used up) and is dropped after the call.
+# Both take an optional ON CONFLICT clause (e.g. "DO NOTHING") and RETURNING
+# column list, and split large inputs into batch_size chunks.
+DEFAULT_METHOD = os.environ.get("BULK_WRITE_METHOD", "values")
+DEFAULT_BATCH_SIZE = int(os.environ.get("BULK_WRITE_BATCH_SIZE", "500"))
+
+def _identifiers(names):
+    return sql.SQL(", ").join(sql.Identifier(name) for name in names)
+
+def _table(name):
+    return sql.Identifier(*name.split("."))
+
+def _batches(rows, batch_size):
+    rows = list(rows)
+    for start in range(0, len(rows), batch_size):
+        yield rows[start:start + batch_size]
+
+def _suffix(on_conflict, returning):
+    parts = []
+    if on_conflict:
+        parts.append(sql.SQL(" ON CONFLICT ") + sql.SQL(on_conflict))
+    if returning:
+        parts.append(sql.SQL(" RETURNING ") + _identifiers(returning))
+    return sql.Composed(parts)
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+def _copy_buffer(rows):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    return buffer
+
+def insert_values(cur, table, columns, rows, batch_size=DEFAULT_BATCH_SIZE, on_conflict=None, returning=None):
+    query = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(_table(table), _identifiers(columns)) \
+        + _suffix(on_conflict, returning)
+    query = query.as_string(cur)
+    returned = []
+    for batch in _batches(rows, batch_size):
+        result = execute_values(cur, query, batch, page_size=len(batch), fetch=bool(returning))
+        if returning:
+            returned.extend(result)
+    return returned
+
+def insert_copy(cur, table, columns, rows, batch_size=DEFAULT_BATCH_SIZE, on_conflict=None, returning=None):
+    returned = []
+    if not on_conflict and not returning:
+        copy = sql.SQL("COPY {} ({}) FROM STDIN").format(_table(table), _identifiers(columns))
+        for batch in _batches(rows, batch_size):
+            cur.copy_expert(copy.as_string(cur), _copy_buffer(batch))
+        return returned
+
+    staging = sql.Identifier(f"bulk_staging_{uuid.uuid4().hex[:12]}")
+    cur.execute(sql.SQL("CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA").format(
+        staging, _identifiers(columns), _table(table)
+    ))
+    copy = sql.SQL("COPY {} ({}) FROM STDIN").format(staging, _identifiers(columns))
+    move = sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {}").format(
+        _table(table), _identifiers(columns), _identifiers(columns), staging
+    ) + _suffix(on_conflict, returning)
+    for batch in _batches(rows, batch_size):
+        cur.copy_expert(copy.as_string(cur), _copy_buffer(batch))
+        cur.execute(move)
+        if returning:
+            returned.extend(cur.fetchall())
+        cur.execute(sql.SQL("TRUNCATE {}").format(staging))
+    # Dropped here (a rollback drops it too) so later calls in the same transaction never reuse it.
+    cur.execute(sql.SQL("DROP TABLE {}").format(staging))
+    return returned
+
+def write_rows(conn, table, columns, rows, method=DEFAULT_METHOD, batch_size=DEFAULT_BATCH_SIZE,
+               on_conflict=None, returning=None, commit=True):
+    """Insert rows (tuples ordered like columns); returns the RETURNING rows, if any."""
+    rows = list(rows)
+    if not rows:
+        return []
+    writer = insert_copy if method == "copy" else insert_values
+    cur = conn.cursor()
+    try:
+        returned = writer(cur, table, columns, rows, batch_size, on_conflict, returning)
+    finally:
+        cur.close()
+    if commit:
+        conn.commit()
+    return returned
+
+def update_rows(conn, table, key, columns, rows, types, batch_size=DEFAULT_BATCH_SIZE, commit=True):
+    """UPDATE table SET columns = v.columns FROM (VALUES ...) v WHERE table.key = v.key.
+
+    rows are (key, *columns) tuples; types gives the SQL type of each value for
+    the VALUES list, e.g. ["integer", "double precision", ...].
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    names = [key] + list(columns)
+    query = sql.SQL("UPDATE {} AS t SET {} FROM (VALUES %s) AS v ({}) WHERE t.{} = v.{}").format(
+        _table(table),
+        sql.SQL(", ").join(sql.SQL("{} = v.{}").format(sql.Identifier(c), sql.Identifier(c)) for c in columns),
+        _identifiers(names),
+        sql.Identifier(key),
+        sql.Identifier(key),
+    )
+    template = "(" + ", ".join(f"%s::{sql_type}" for sql_type in types) + ")"
+    cur = conn.cursor()
+    try:
+        query = query.as_string(cur)
+        updated = 0
+        for batch in _batches(rows, batch_size):
+            execute_values(cur, query, batch, template=template, page_size=len(batch))
+            updated += cur.rowcount
+    finally:
+        cur.close()
+    if commit:
+        conn.commit()
+    return updated
+
+class BulkWriter:
+    """Buffers rows and writes them batch_size at a time, e.g. while a job streams results."""
+    def __init__(self, connection_factory, table, columns, method=DEFAULT_METHOD, batch_size=DEFAULT_BATCH_SIZE,
+                 on_conflict=None, returning=None, on_flush=None):
+        self.connection_factory = connection_factory
+        self.table = table
+        self.columns = columns
+        self.method = method
+        self.batch_size = batch_size
+        self.on_conflict = on_conflict
+        self.returning = returning
+        self.on_flush = on_flush
+        self.pending = []
+        self.written = 0
+
+    def add(self, row):
+        self.pending.append(row)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def extend(self, rows):
+        for row in rows:
+            self.add(row)
+
+    def flush(self):
+        if not self.pending:
+            return []
+        rows, self.pending = self.pending, []
+        with self.connection_factory() as conn:
+            returned = write_rows(conn, self.table, self.columns, rows, self.method, self.batch_size,
+                                  self.on_conflict, self.returning)
+        self.written += len(rows)
+        if self.on_flush:
+            self.on_flush(rows, returned)
+        return returned
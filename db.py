@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+import psycopg2
+from psycopg2 import extensions, pool
+
+# ------------------ DB Settings ------------------
+DB_CONFIG = {
+    "host": os.environ.get("DB_HOST", "localhost"),
+    "dbname": os.environ.get("DB_NAME", "llmqa"),
+    "user": os.environ.get("DB_USER", "postgres"),
+    "password": os.environ.get("DB_PASSWORD", "postgres"),
+    "port": os.environ.get("DB_PORT", "5432"),
+}
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+# Connections idle for longer than this are pinged before being handed out.
+DB_HEALTH_CHECK_AFTER = float(os.environ.get("DB_HEALTH_CHECK_AFTER", "30"))
+
+# ------------------ Connection Pool ------------------
+# psycopg2's ThreadedConnectionPool raises as soon as it is exhausted; the
+# semaphore in front of it makes callers wait for a free connection instead.
+class ConnectionPool:
+    def __init__(self, minconn=DB_POOL_MIN, maxconn=DB_POOL_MAX, timeout=DB_POOL_TIMEOUT,
+                 health_check_after=DB_HEALTH_CHECK_AFTER, **config):
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self._pool = pool.ThreadedConnectionPool(minconn, maxconn, **(config or DB_CONFIG))
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "timeouts": 0,
+            "health_check_failures": 0,
+            "in_use": 0,
+        }
+
+    def _count(self, key, value=1):
+        with self._lock:
+            self.stats[key] += value
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        idle = time.monotonic() - self._last_used.get(id(conn), 0)
+        if idle < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def checkout(self):
+        if not self._slots.acquire(blocking=False):
+            self._count("waits")
+            start = time.perf_counter()
+            acquired = self._slots.acquire(timeout=self.timeout)
+            self._count("wait_seconds", time.perf_counter() - start)
+            if not acquired:
+                self._count("timeouts")
+                raise pool.PoolError(f"no database connection available after {self.timeout}s")
+
+        try:
+            conn = self._pool.getconn()
+            while not self._is_healthy(conn):
+                self._count("health_check_failures")
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        self._count("checkouts")
+        self._count("in_use")
+        return conn
+
+    def release(self, conn):
+        try:
+            broken = conn.closed != 0
+            if not broken and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                # Don't hand the next caller a half-finished transaction.
+                conn.rollback()
+            self._last_used[id(conn)] = time.monotonic()
+            self._pool.putconn(conn, close=broken)
+        finally:
+            self._count("in_use", -1)
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.checkout()
+        try:
+            yield conn
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, max_size=self.maxconn)
+
+    def close(self):
+        self._pool.closeall()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+def get_connection():
+    """Check a connection out of the shared pool: `with get_connection() as conn: ...`"""
+    return get_pool().connection()
+
+def get_pool_stats():
+    return get_pool().get_stats()
@@ -0,0 +1,283 @@
+# dedup_index.py
+# Near-duplicate detection for generated questions.
+#
+#   python dedup_index.py --topic "Operating Systems" --threshold 0.6
+#
+# Questions are reduced to character shingles and MinHash signatures; LSH bands
+# over the signatures give each new candidate a handful of possible matches
+# instead of a scan over every stored question. Candidates are confirmed by the
+# estimated Jaccard similarity and, when an embedding model is supplied, by the
+# cosine similarity of the question embeddings (catches rewordings that share
+# few characters). Run as a script it scans the questions table and prints the
+# duplicate clusters per topic.
+import argparse
+import re
+import threading
+import zlib
+import numpy as np
+from db import get_connection
+from question_catalog import get_question_catalog
+from vector_search import VectorMatrix
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+NUM_BANDS = 32
+DEFAULT_JACCARD_THRESHOLD = 0.6
+DEFAULT_COSINE_THRESHOLD = 0.92
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+def normalize_text(text):
+    return " ".join(re.sub(r"[^a-z0-9 ]+", " ", str(text).lower()).split())
+
+def shingles(text, size=SHINGLE_SIZE):
+    text = normalize_text(text)
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[start:start + size] for start in range(len(text) - size + 1)}
+
+class MinHasher:
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self._a = rng.randint(1, 1 << 61, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 61, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        values = shingles(text)
+        if not values:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        hashes = np.fromiter((zlib.crc32(value.encode("utf-8")) for value in values), dtype=np.uint64, count=len(values))
+        # Wrapping uint64 arithmetic is intended here (same scheme as datasketch).
+        with np.errstate(over="ignore"):
+            permuted = (hashes[:, None] * self._a + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0)
+
+# ------------------ Index ------------------
+class DuplicateIndex:
+    """MinHash/LSH index over (key, text) items, e.g. question ids and question text."""
+    def __init__(self, jaccard_threshold=DEFAULT_JACCARD_THRESHOLD, embeddings=None,
+                 cosine_threshold=DEFAULT_COSINE_THRESHOLD, num_perm=NUM_PERM, bands=NUM_BANDS):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.jaccard_threshold = jaccard_threshold
+        self.embeddings = embeddings
+        self.cosine_threshold = cosine_threshold
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self._hasher = MinHasher(num_perm)
+        self._keys = []
+        self._signatures = np.empty((0, num_perm), dtype=np.uint64)
+        self._count = 0
+        self._buckets = [{} for _ in range(bands)]
+        self._exact = {}
+        self._vectors = VectorMatrix() if embeddings is not None else None
+
+    def __len__(self):
+        return self._count
+
+    def _band_keys(self, signature):
+        step = self.rows_per_band
+        return [signature[start:start + step].tobytes() for start in range(0, len(signature), step)]
+
+    def _embed(self, texts):
+        if hasattr(self.embeddings, "embed_documents_array"):
+            return self.embeddings.embed_documents_array(list(texts))
+        return np.asarray(self.embeddings.embed_documents(list(texts)), dtype=np.float32)
+
+    def _append(self, key, text, signature):
+        row = self._count
+        if row == len(self._signatures):
+            grown = np.empty((max(64, 2 * row), self._signatures.shape[1]), dtype=np.uint64)
+            grown[:row] = self._signatures[:row]
+            self._signatures = grown
+        self._signatures[row] = signature
+        self._keys.append(key)
+        self._count += 1
+        for band, band_key in enumerate(self._band_keys(signature)):
+            self._buckets[band].setdefault(band_key, []).append(row)
+        self._exact.setdefault(normalize_text(text), row)
+
+    def add_many(self, items):
+        """Index (key, text) pairs without checking them against each other."""
+        items = [(key, text) for key, text in items if normalize_text(text)]
+        if not items:
+            return
+        if self._vectors is not None:
+            self._vectors.add(self._embed(text for _, text in items))
+        for key, text in items:
+            self._append(key, text, self._hasher.signature(text))
+
+    def add(self, key, text):
+        self.add_many([(key, text)])
+
+    def _matches(self, text, signature, vector=None, exclude=None):
+        matches = {}
+        exact = self._exact.get(normalize_text(text)) if text is not None else None
+        if exact is not None and exact != exclude:
+            matches[exact] = 1.0
+
+        candidates = set()
+        for band, band_key in enumerate(self._band_keys(signature)):
+            candidates.update(self._buckets[band].get(band_key, ()))
+        candidates.discard(exclude)
+        if candidates:
+            rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            similarity = (self._signatures[rows] == signature).mean(axis=1)
+            for row, score in zip(rows.tolist(), similarity.tolist()):
+                if score >= self.jaccard_threshold:
+                    matches[row] = max(matches.get(row, 0.0), score)
+
+        if vector is not None and len(self._vectors):
+            indices, scores = self._vectors.search(vector, k=5)
+            for row, score in zip(indices[0].tolist(), scores[0].tolist()):
+                if row != exclude and score >= self.cosine_threshold:
+                    matches[row] = max(matches.get(row, 0.0), float(score))
+        return matches
+
+    def query(self, text):
+        """Return [(key, similarity)] of indexed items that near-duplicate text, best first."""
+        if not self._count or not normalize_text(text):
+            return []
+        vector = self._embed([text]) if self._vectors is not None else None
+        matches = self._matches(text, self._hasher.signature(text), vector)
+        return [(self._keys[row], score) for row, score in sorted(matches.items(), key=lambda item: -item[1])]
+
+    def is_duplicate(self, text):
+        return bool(self.query(text))
+
+    def add_if_new(self, key, text):
+        """Index the item unless it duplicates one already indexed; returns the matched key or None."""
+        if not normalize_text(text):
+            return None
+        matches = self.query(text)
+        if matches:
+            return matches[0][0]
+        self.add(key, text)
+        return None
+
+    def clusters(self):
+        """Group every indexed item with its near-duplicates; returns lists of keys (size > 1)."""
+        parent = list(range(self._count))
+
+        def find(row):
+            while parent[row] != row:
+                parent[row] = parent[parent[row]]
+                row = parent[row]
+            return row
+
+        for row in range(self._count):
+            signature = self._signatures[row]
+            vector = self._vectors.vectors[row] if self._vectors is not None else None
+            for other in self._matches(None, signature, vector, exclude=row):
+                parent[find(other)] = find(row)
+
+        groups = {}
+        for row in range(self._count):
+            groups.setdefault(find(row), []).append(self._keys[row])
+        return [keys for keys in groups.values() if len(keys) > 1]
+
+# ------------------ Topic Indexes ------------------
+# One index per topic, kept in step with the question catalog: new question ids
+# are added incrementally, a deleted or edited question triggers a rebuild.
+class QuestionDuplicateIndex:
+    def __init__(self, topic, **options):
+        self.topic = topic
+        self.options = options
+        self._index = None
+        self._texts = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _sync(self):
+        catalog = get_question_catalog()
+        current = catalog.topic_questions(self.topic)
+        if self._version == catalog.version:
+            return
+        if self._index is None or any(current.get(key) != text for key, text in self._texts.items()):
+            self._index = DuplicateIndex(**self.options)
+            self._texts = {}
+        new = [(key, text) for key, text in current.items() if key not in self._texts]
+        self._index.add_many(new)
+        self._texts.update(new)
+        self._version = catalog.version
+
+    def query(self, text):
+        with self._lock:
+            self._sync()
+            return self._index.query(text)
+
+    def filter_new(self, texts):
+        """Return the indexes of texts that duplicate neither stored questions nor each other."""
+        with self._lock:
+            self._sync()
+            batch = DuplicateIndex(**self.options)
+            keep = []
+            for position, text in enumerate(texts):
+                if self._index.query(text) or batch.add_if_new(position, text) is not None:
+                    continue
+                keep.append(position)
+            return keep
+
+
+_topic_indexes = {}
+_topic_indexes_lock = threading.Lock()
+
+def get_duplicate_index(topic):
+    with _topic_indexes_lock:
+        if topic not in _topic_indexes:
+            _topic_indexes[topic] = QuestionDuplicateIndex(topic)
+        return _topic_indexes[topic]
+
+# ------------------ Table Scan ------------------
+def iter_questions(topic=None, fetch_size=2000):
+    """Stream (id, topic_name, question) rows through a server-side cursor."""
+    with get_connection() as conn:
+        cur = conn.cursor(name="dedup_scan")
+        cur.itersize = fetch_size
+        if topic:
+            cur.execute("SELECT id, topic_name, question FROM public.questions WHERE topic_name = %s ORDER BY id", (topic,))
+        else:
+            cur.execute("SELECT id, topic_name, question FROM public.questions ORDER BY topic_name, id")
+        for row in cur:
+            yield row
+        cur.close()
+        conn.commit()
+
+def find_duplicate_clusters(topic=None, **options):
+    """Scan the questions table; returns {topic: [[(id, question), ...], ...]}."""
+    indexes, texts = {}, {}
+    for question_id, topic_name, question in iter_questions(topic):
+        index = indexes.get(topic_name)
+        if index is None:
+            index = indexes[topic_name] = DuplicateIndex(**options)
+        texts[question_id] = question
+        index.add(question_id, question)
+    result = {}
+    for topic_name, index in indexes.items():
+        clusters = index.clusters()
+        if clusters:
+            result[topic_name] = [[(question_id, texts[question_id]) for question_id in sorted(cluster)] for cluster in clusters]
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="List near-duplicate questions per topic.")
+    parser.add_argument("--topic", help="only scan this topic")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_JACCARD_THRESHOLD,
+                        help="estimated shingle Jaccard similarity that counts as a duplicate")
+    args = parser.parse_args()
+
+    clusters = find_duplicate_clusters(args.topic, jaccard_threshold=args.threshold)
+    total = 0
+    for topic_name, topic_clusters in clusters.items():
+        print(f"== {topic_name}: {len(topic_clusters)} clusters")
+        for cluster in topic_clusters:
+            total += len(cluster) - 1
+            for question_id, question in cluster:
+                print(f"  [{question_id}] {question}")
+            print()
+    print(f"{total} questions duplicate an earlier one.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+import numpy as np
+from langchain_core.documents import Document
+from vector_search import VectorMatrix
+
+# ------------------ Persistent Document Index ------------------
+# On-disk replacement for the module-level InMemoryVectorStore. Each namespace
+# (one per topic) lives in its own directory:
+#   documents.json  content hash of every indexed PDF -> source, chunk hashes
+#   chunks.jsonl    one line per unique chunk: text, metadata, chunk hash
+#   vectors.npy     L2-normalized float32 matrix, row i belongs to chunk line i
+# Every save rewrites chunks.jsonl and vectors.npy through temp files. Lines
+# without a vector (left by a crash between the two) are dropped on load, and
+# the next save writes a chunks.jsonl that matches the matrix again. Each save
+# ends by writing a fresh random token to version; readers reload when it no
+# longer matches the one they loaded (file times are too coarse for that).
+# A PDF whose content hash is already known is never parsed or embedded again,
+# and chunks whose text already exists in the namespace are not stored twice.
+INDEX_STORAGE_PATH = "document_store/index/"
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def chunk_hash(text):
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+def _namespace_dir(name):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name.strip()) or "default"
+
+def _embed_documents(embeddings, texts):
+    if hasattr(embeddings, "embed_documents_array"):
+        return embeddings.embed_documents_array(texts)
+    return np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+
+def _embed_query(embeddings, text):
+    if hasattr(embeddings, "embed_query_array"):
+        return embeddings.embed_query_array(text)
+    return np.asarray(embeddings.embed_query(text), dtype=np.float32)
+
+class IndexNamespace:
+    def __init__(self, path, mmap=True):
+        self.path = path
+        self.mmap = mmap
+        self.documents = {}
+        self.chunks = []
+        self.matrix = VectorMatrix()
+        self._chunk_rows = {}
+        self._loaded_version = None
+        self._load()
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _version(self):
+        try:
+            with open(self._file("version")) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def is_stale(self):
+        """True when another process (e.g. the ingestion worker) has written since we loaded."""
+        return self._version() != self._loaded_version
+
+    def _load(self):
+        self._loaded_version = self._version()
+        if os.path.exists(self._file("documents.json")):
+            with open(self._file("documents.json")) as f:
+                self.documents = json.load(f)
+        if os.path.exists(self._file("chunks.jsonl")):
+            with open(self._file("chunks.jsonl")) as f:
+                self.chunks = []
+                for line in f:
+                    try:
+                        self.chunks.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Half-written last line from a crash.
+                        break
+        # A crash between writing chunks and saving vectors leaves extra lines.
+        if os.path.exists(self._file("vectors.npy")):
+            rows = len(np.load(self._file("vectors.npy"), mmap_mode="r"))
+            self.chunks = self.chunks[:rows]
+            self.matrix = VectorMatrix.load(
+                self._file("vectors.npy"), [chunk["metadata"] for chunk in self.chunks], mmap=self.mmap
+            )
+        else:
+            self.chunks = []
+        self._chunk_rows = {chunk["hash"]: row for row, chunk in enumerate(self.chunks)}
+
+    def _save(self):
+        os.makedirs(self.path, exist_ok=True)
+        # Rewritten in full rather than appended, so orphan lines from a crash
+        # can never shift chunks out of step with the vector rows.
+        tmp_chunks = self._file("chunks.jsonl.tmp")
+        with open(tmp_chunks, "w") as f:
+            for chunk in self.chunks:
+                f.write(json.dumps(chunk, default=str) + "\n")
+        os.replace(tmp_chunks, self._file("chunks.jsonl"))
+        self.matrix.save(self._file("vectors.npy"))
+        # documents.json is written last: a document only counts as indexed
+        # once its chunks and vectors are on disk.
+        tmp_documents = self._file("documents.json.tmp")
+        with open(tmp_documents, "w") as f:
+            json.dump(self.documents, f)
+        os.replace(tmp_documents, self._file("documents.json"))
+        version = uuid.uuid4().hex
+        tmp_version = self._file("version.tmp")
+        with open(tmp_version, "w") as f:
+            f.write(version)
+        os.replace(tmp_version, self._file("version"))
+        self._loaded_version = version
+
+    def is_complete(self, document_hash):
+        return document_hash in self.documents and self.documents[document_hash].get("complete", True)
+
+    def add(self, document_hash, source, document_chunks, embeddings, complete=True):
+        new_chunks, chunk_hashes, seen = [], [], set()
+        for doc in document_chunks:
+            key = chunk_hash(doc.page_content)
+            chunk_hashes.append(key)
+            if key in self._chunk_rows or key in seen:
+                continue
+            seen.add(key)
+            new_chunks.append({"hash": key, "text": doc.page_content, "metadata": doc.metadata})
+
+        if new_chunks:
+            new_vectors = _embed_documents(embeddings, [chunk["text"] for chunk in new_chunks])
+            self.matrix.add(new_vectors, [chunk["metadata"] for chunk in new_chunks])
+        for chunk in new_chunks:
+            self._chunk_rows[chunk["hash"]] = len(self.chunks)
+            self.chunks.append(chunk)
+        # Streaming ingestion adds a document in several batches; it only counts
+        # as indexed once the last batch is marked complete.
+        entry = self.documents.setdefault(document_hash, {"source": source, "chunk_hashes": [], "new_chunks": 0})
+        known = set(entry["chunk_hashes"])
+        entry["chunk_hashes"].extend(key for key in dict.fromkeys(chunk_hashes) if key not in known)
+        entry["new_chunks"] += len(new_chunks)
+        entry["complete"] = complete
+        entry["indexed_at"] = time.time()
+        self._save()
+        return len(new_chunks)
+
+    def search(self, query_vector, k=4, document_hash=None, source=None, page_range=None):
+        rows = None
+        if document_hash:
+            if document_hash not in self.documents:
+                return []
+            rows = sorted({
+                self._chunk_rows[key] for key in self.documents[document_hash]["chunk_hashes"] if key in self._chunk_rows
+            })
+        indices, scores = self.matrix.search(query_vector, k=k, source=source, page_range=page_range, rows=rows)
+        return [(self.chunks[row], float(score)) for row, score in zip(indices[0], scores[0])]
+
+
+class DocumentIndex:
+    def __init__(self, embeddings, root=INDEX_STORAGE_PATH, mmap=True):
+        self.embeddings = embeddings
+        self.root = root
+        self.mmap = mmap
+        self._namespaces = {}
+        self._lock = threading.Lock()
+
+    def namespace(self, name):
+        key = _namespace_dir(name or "default")
+        if key not in self._namespaces or self._namespaces[key].is_stale():
+            self._namespaces[key] = IndexNamespace(os.path.join(self.root, key), mmap=self.mmap)
+        return self._namespaces[key]
+
+    def has_document(self, document_hash, namespace=None):
+        with self._lock:
+            return self.namespace(namespace).is_complete(document_hash)
+
+    def has_chunks(self, document_hash, namespace=None):
+        with self._lock:
+            return bool(self.namespace(namespace).documents.get(document_hash, {}).get("chunk_hashes"))
+
+    def add_document(self, document_hash, document_chunks, namespace=None, source=None):
+        """Index one document's chunks; returns the number of chunks that were new."""
+        with self._lock:
+            ns = self.namespace(namespace)
+            if ns.is_complete(document_hash):
+                return 0
+            return ns.add(document_hash, source, document_chunks, self.embeddings)
+
+    def add_chunks(self, document_hash, document_chunks, namespace=None, source=None, complete=False):
+        """Append one batch of a document that is still being ingested."""
+        with self._lock:
+            return self.namespace(namespace).add(
+                document_hash, source, document_chunks, self.embeddings, complete=complete
+            )
+
+    def document_chunks(self, document_hash, namespace=None):
+        """Chunks of one document in the order they were indexed (page order)."""
+        with self._lock:
+            ns = self.namespace(namespace)
+            chunk_hashes = ns.documents.get(document_hash, {}).get("chunk_hashes", [])
+            return [ns.chunks[ns._chunk_rows[key]] for key in chunk_hashes if key in ns._chunk_rows]
+
+    def similarity_search(self, query, k=4, namespace=None, document_hash=None, source=None, page_range=None):
+        """Top-k chunks for a query, optionally limited to one document, source file or page range."""
+        query_vector = _embed_query(self.embeddings, query)
+        with self._lock:
+            hits = self.namespace(namespace).search(
+                query_vector, k=k, document_hash=document_hash, source=source, page_range=page_range
+            )
+        return [Document(page_content=chunk["text"], metadata=chunk["metadata"]) for chunk, _ in hits]
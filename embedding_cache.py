@@ -0,0 +1,86 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# ------------------ Embedding Cache ------------------
+# Wraps an embeddings model so each (model, text) pair is embedded at most once
+# while it stays cached. Vectors are kept as float32 arrays in an LRU bounded by
+# total bytes; cache misses are de-duplicated and sent to the model in batches.
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_BATCH_SIZE = 32
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings, model_name, max_bytes=DEFAULT_MAX_BYTES, batch_size=DEFAULT_BATCH_SIZE):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self._vectors = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "batches": 0, "evictions": 0}
+
+    def _key(self, text):
+        return self.model_name, hashlib.sha256(text.encode("utf-8")).digest()
+
+    def _get(self, key):
+        vector = self._vectors.get(key)
+        if vector is not None:
+            self._vectors.move_to_end(key)
+        return vector
+
+    def _put(self, key, vector):
+        if key in self._vectors:
+            return
+        self._vectors[key] = vector
+        self._bytes += vector.nbytes
+        while self._bytes > self.max_bytes and len(self._vectors) > 1:
+            _, evicted = self._vectors.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self.stats["evictions"] += 1
+
+    def embed_documents_array(self, texts):
+        """Embed texts as an (n, dim) float32 array, calling the model only for misses."""
+        texts = list(texts)
+        keys = [self._key(text) for text in texts]
+        found = {}
+        missing = OrderedDict()
+        with self._lock:
+            for key, text in zip(keys, texts):
+                vector = self._get(key)
+                if vector is not None:
+                    found[key] = vector
+                    self.stats["hits"] += 1
+                else:
+                    missing.setdefault(key, text)
+                    self.stats["misses"] += 1
+
+        missing_keys = list(missing)
+        for start in range(0, len(missing_keys), self.batch_size):
+            batch_keys = missing_keys[start:start + self.batch_size]
+            vectors = np.asarray(self.embeddings.embed_documents([missing[key] for key in batch_keys]), dtype=np.float32)
+            with self._lock:
+                self.stats["batches"] += 1
+                for key, vector in zip(batch_keys, vectors):
+                    vector = np.ascontiguousarray(vector)
+                    found[key] = vector
+                    self._put(key, vector)
+
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([found[key] for key in keys])
+
+    def embed_query_array(self, text):
+        return self.embed_documents_array([text])[0]
+
+    def embed_documents(self, texts):
+        return self.embed_documents_array(texts).tolist()
+
+    def embed_query(self, text):
+        return self.embed_query_array(text).tolist()
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._vectors), bytes=self._bytes, max_bytes=self.max_bytes)
@@ -0,0 +1,147 @@
+import json
+import os
+from llm_client import get_llm_pool
+from llm_cache import get_llm_cache, make_cache_key
+from llm_json import parse_or_repair, try_extract_json
+from llm_stream import stream_json
+
+# ------------------ LLM Grading ------------------
+# Streamlit-free grading helpers shared by the answer evaluator page and the
+# offline re-grading job.
+LLM_MODEL = "deepseek-r1:1.5b"
+
+# "structured" constrains the answer to EVALUATION_FORMAT through Ollama's
+# format= JSON schema, skips the reasoning block and caps the reply at
+# GRADING_NUM_PREDICT tokens; "free" is the original free-text response,
+# streamed and cut off at the end of the JSON object.
+GRADING_MODE = os.environ.get("GRADING_MODE", "structured")
+GRADING_NUM_PREDICT = int(os.environ.get("GRADING_NUM_PREDICT", "64"))
+GRADING_THINK = os.environ.get("GRADING_THINK", "0") == "1"
+
+EVALUATION_FORMAT = {
+    "type": "object",
+    "properties": {
+        "correctness": {"type": "integer", "enum": [0, 1]},
+        "completeness": {"type": "integer", "minimum": 0, "maximum": 100},
+        "relevance": {"type": "integer", "minimum": 0, "maximum": 100},
+        "depth": {"type": "integer", "minimum": 0, "maximum": 100},
+    },
+    "required": ["correctness", "completeness", "relevance", "depth"],
+}
+
+EVALUATION_PROMPT = """
+                You are an expert answer evaluator. Compare the student's answer with the reference answer to the question.
+
+                ### Question:
+                {question}
+
+                ### Reference Answer:
+                {correct_answer}
+
+                ### Student Answer:
+                {user_answer}
+
+                Evaluation Guidelines:
+                1. "correctness": 1 if the student's answer includes at least 50% of the key reasons from the reference answer; otherwise 0.
+                2. "completeness": Score 0–100 based on how many key points from the reference are covered. Partial matches are allowed.
+                3. "relevance": Score 0–100 based on how focused the student's answer is on valid reasons for deforestation.
+                4. "depth": Score 0–100 based on the richness of explanation (just listing is low depth, reasoning is high depth).
+
+                Respond ONLY in valid JSON format like this:
+                ```json
+                {{
+                "correctness": 1,
+                "completeness": 60,
+                "relevance": 70,
+                "depth": 40
+                }}
+                """
+
+def build_evaluation_prompt(question, correct_answer, user_answer):
+    return EVALUATION_PROMPT.format(
+        question=question,
+        correct_answer=correct_answer,
+        user_answer=user_answer
+    )
+
+def evaluation_request(question, correct_answer, user_answer, mode=None, think=None, num_predict=None):
+    """Keyword arguments for OllamaPool.chat() for one grading request in the given mode."""
+    mode = mode or GRADING_MODE
+    request = {
+        "model": LLM_MODEL,
+        "messages": [{"role": "user", "content": build_evaluation_prompt(question, correct_answer, user_answer)}],
+        "workload": "evaluation",
+        "options": {
+            "temperature": 0  # makes response deterministic
+        },
+    }
+    if mode == "structured":
+        think = GRADING_THINK if think is None else think
+        request["format"] = EVALUATION_FORMAT
+        request["think"] = think
+        # Reasoning tokens count against num_predict, so only cap replies without it.
+        if not think:
+            request["options"]["num_predict"] = num_predict or GRADING_NUM_PREDICT
+    return request
+
+def request_evaluation(question, correct_answer, user_answer, use_cache=True, on_progress=None, mode=None):
+    """Return the evaluation JSON text.
+
+    Only free mode streams: on_progress(state) is called for every chunk.
+    Structured requests return in one piece and never call it. The cache key
+    covers the mode and its request options, so each mode keeps its own grades.
+    """
+    mode = mode or GRADING_MODE
+    request = evaluation_request(question, correct_answer, user_answer, mode)
+    settings = {name: value for name, value in request.items() if name not in ("messages", "workload")}
+    cache = get_llm_cache()
+    key = make_cache_key(
+        "evaluation", LLM_MODEL, EVALUATION_PROMPT,
+        question=question, correct_answer=correct_answer, user_answer=user_answer,
+        settings=json.dumps(dict(settings, mode=mode), sort_keys=True)
+    )
+    if use_cache:
+        content = cache.get(key)
+        if content is not None:
+            return content
+
+    if mode == "structured":
+        response = get_llm_pool().chat(**request)
+        content = raw = response['message']['content']
+    else:
+        # Streamed so the request ends as soon as the JSON object is closed.
+        state = None
+        for state in stream_json(
+            LLM_MODEL, request["messages"][0]["content"], workload="evaluation", options=request["options"]
+        ):
+            if on_progress is not None:
+                on_progress(state)
+        content = state.json.text if state.complete else state.visible
+        # With the reasoning kept, extract_json can fall back to JSON written inside <think>.
+        raw = state.text
+    if parse_evaluation(content) is None:
+        result = parse_or_repair(raw, "evaluation", LLM_MODEL, workload="evaluation")
+        if result is None:
+            return content
+        content = json.dumps(result)
+    # Only keep responses we can actually use.
+    cache.set(key, content, kind="evaluation")
+    return content
+
+def parse_evaluation(content):
+    """Validated evaluation dict (scores coerced and clamped) or None."""
+    return try_extract_json(content, "evaluation")
+
+def grade_answer(question, correct_answer, user_answer):
+    return parse_evaluation(request_evaluation(question, correct_answer, user_answer))
+
+def grade_many(items):
+    """Grade (question, correct_answer, user_answer) tuples concurrently.
+
+    Results are in input order; a failed request yields its exception.
+    """
+    return get_llm_pool().map(grade_answer, items)
+
+# Final Score Calculation (custom weights)
+def compute_final_score(result):
+    return round(result["completeness"] * 0.4 + result["relevance"] * 0.4 + result["depth"] * 0.2, 2)
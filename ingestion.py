@@ -0,0 +1,157 @@
+import atexit
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+import uuid
+from langchain_ollama import OllamaEmbeddings
+from document_index import DocumentIndex, INDEX_STORAGE_PATH
+from embedding_cache import CachedEmbeddings
+from model_sessions import get_model_sessions
+from pdf_pages import iter_pdf_pages_parallel, count_pdf_pages, chunk_documents
+
+# ------------------ Background PDF Ingestion ------------------
+# Uploaded PDFs are parsed, chunked and embedded in a separate worker process
+# instead of inside the Streamlit request. Pages are read lazily and every
+# PAGES_PER_BATCH pages are chunked, embedded and appended to the on-disk
+# document index, so the admin can query a document while its later pages are
+# still being processed. The worker reports progress back over a queue.
+EMBEDDING_MODEL_NAME = "deepseek-r1:1.5b"
+PAGES_PER_BATCH = int(os.environ.get("INGEST_PAGES_PER_BATCH", "8"))
+
+def build_embeddings():
+    options = {"model": EMBEDDING_MODEL_NAME}
+    # OllamaEmbeddings only has keep_alive from langchain-ollama 0.3.0 and older
+    # releases reject unknown fields; without it Ollama's default keep-alive applies.
+    fields = getattr(OllamaEmbeddings, "model_fields", None) or getattr(OllamaEmbeddings, "__fields__", {})
+    if "keep_alive" in fields:
+        options["keep_alive"] = get_model_sessions().keep_alive("embedding")
+    return CachedEmbeddings(OllamaEmbeddings(**options), model_name=EMBEDDING_MODEL_NAME)
+
+# ------------------ Worker Process ------------------
+def _ingest(job, index, events):
+    job_id = job["id"]
+    total_pages = count_pdf_pages(job["file_path"])
+    progress = {"status": "running", "total_pages": total_pages, "pages_done": 0, "chunks": 0, "new_chunks": 0}
+    events.put((job_id, dict(progress, started_at=time.time())))
+
+    def flush(pages, complete):
+        chunks = chunk_documents(pages)
+        progress["new_chunks"] += index.add_chunks(
+            job["document_hash"], chunks, namespace=job["namespace"], source=job["source"], complete=complete
+        )
+        progress["chunks"] += len(chunks)
+        progress["pages_done"] += len(pages)
+        events.put((job_id, dict(progress)))
+
+    batch = []
+    for page in iter_pdf_pages_parallel(job["file_path"]):
+        batch.append(page)
+        if len(batch) >= PAGES_PER_BATCH:
+            flush(batch, complete=False)
+            batch = []
+    flush(batch, complete=True)
+    events.put((job_id, {"status": "done", "finished_at": time.time()}))
+
+def _worker_main(jobs, events, index_root):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    index = DocumentIndex(build_embeddings(), root=index_root)
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        try:
+            _ingest(job, index, events)
+        except Exception as e:
+            logging.exception(f"Ingestion of {job['source']} failed")
+            events.put((job["id"], {"status": "failed", "error": str(e), "finished_at": time.time()}))
+
+# ------------------ Job Queue ------------------
+class IngestionQueue:
+    def __init__(self, index_root=INDEX_STORAGE_PATH):
+        self.index_root = index_root
+        self._context = mp.get_context("spawn")
+        self._jobs = self._context.Queue()
+        self._events = self._context.Queue()
+        self._process = None
+        self._progress = {}
+        self._by_document = {}
+        self._lock = threading.Lock()
+        self._listener = threading.Thread(target=self._drain_events, name="ingestion-events", daemon=True)
+        self._listener.start()
+        atexit.register(self.shutdown)
+
+    def _ensure_worker(self):
+        if self._process is None or not self._process.is_alive():
+            # Not a daemon: the worker starts its own page-parsing pool.
+            self._process = self._context.Process(
+                target=_worker_main, args=(self._jobs, self._events, self.index_root),
+                name="pdf-ingestion"
+            )
+            self._process.start()
+
+    def _drain_events(self):
+        while True:
+            try:
+                job_id, update = self._events.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            with self._lock:
+                self._progress.setdefault(job_id, {}).update(update)
+
+    def submit(self, file_path, document_hash, namespace, source):
+        """Queue a PDF for ingestion; an unfinished job for the same document is reused."""
+        with self._lock:
+            key = (namespace, document_hash)
+            job_id = self._by_document.get(key)
+            if job_id and self._progress[job_id]["status"] != "failed":
+                return job_id
+            job_id = uuid.uuid4().hex
+            self._progress[job_id] = {
+                "status": "queued", "source": source, "pages_done": 0, "total_pages": None,
+                "chunks": 0, "new_chunks": 0, "queued_at": time.time(),
+            }
+            self._by_document[key] = job_id
+            self._ensure_worker()
+        self._jobs.put({
+            "id": job_id, "file_path": file_path, "document_hash": document_hash,
+            "namespace": namespace, "source": source,
+        })
+        return job_id
+
+    def job_for(self, document_hash, namespace):
+        with self._lock:
+            return self._by_document.get((namespace, document_hash))
+
+    def progress(self, job_id):
+        with self._lock:
+            progress = self._progress.get(job_id, {})
+            if progress.get("status") in ("queued", "running") and not self._process.is_alive():
+                progress.update(status="failed", error="ingestion worker exited")
+            return dict(progress)
+
+    def shutdown(self, timeout=5.0):
+        if self._process is None or not self._process.is_alive():
+            return
+        self._jobs.put(None)
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+
+    def queue_depth(self):
+        with self._lock:
+            return sum(1 for progress in self._progress.values() if progress["status"] in ("queued", "running"))
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_ingestion_queue():
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = IngestionQueue()
+    return _queue
@@ -0,0 +1,143 @@
+import logging
+import threading
+import time
+import numpy as np
+import sounddevice as sd
+from audio import SAMPLE_RATE, MAX_RECORDING_SECONDS, to_float32, transcribe_array
+from vad import has_speech, trim_silence
+
+# ------------------ Live Transcription ------------------
+# Transcribes while the student is still speaking. Audio from an input stream
+# is decoded in overlapping windows on a background thread: segments that end
+# before the last OVERLAP_SECONDS of a window are committed, and the next
+# window starts where the last committed segment ended, so a word cut by the
+# window edge is decoded again in full. Until a window fills up, the growing
+# tail is decoded every PARTIAL_EVERY_SECONDS for a tentative preview. On stop
+# only the audio after the last committed segment is left to decode.
+WINDOW_SECONDS = 10
+OVERLAP_SECONDS = 2
+PARTIAL_EVERY_SECONDS = 2
+
+class LiveTranscriber:
+    def __init__(self, model, window_seconds=WINDOW_SECONDS, overlap_seconds=OVERLAP_SECONDS,
+                 sample_rate=SAMPLE_RATE, max_seconds=MAX_RECORDING_SECONDS):
+        self.model = model
+        self.sample_rate = sample_rate
+        self.window = int(window_seconds * sample_rate)
+        self.overlap = int(overlap_seconds * sample_rate)
+        self.partial_every = int(PARTIAL_EVERY_SECONDS * sample_rate)
+        self.max_samples = int(max_seconds * sample_rate)
+        self._blocks = []
+        self._samples = 0
+        self._committed_samples = 0
+        self._committed = []
+        self._tentative = ""
+        self._partial_end = 0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._stream = None
+        self._thread = None
+        self.error = None
+
+    # --- Recording ---
+    def _on_audio(self, indata, frames, time_info, status):
+        with self._lock:
+            room = self.max_samples - self._samples
+            if room <= 0:
+                return
+            block = indata[:room, 0].copy()
+            self._blocks.append(block)
+            self._samples += len(block)
+
+    def start(self):
+        self._stream = sd.InputStream(samplerate=self.sample_rate, channels=1, dtype="int16", callback=self._on_audio)
+        self._stream.start()
+        self._thread = threading.Thread(target=self._run, name="live-transcription", daemon=True)
+        self._thread.start()
+        return self
+
+    def audio(self, start=0, end=None):
+        """Recorded audio as Whisper-ready float32 (optionally a sample range)."""
+        with self._lock:
+            if len(self._blocks) > 1:
+                self._blocks = [np.concatenate(self._blocks)]
+            recorded = self._blocks[0] if self._blocks else np.empty(0, dtype=np.int16)
+        return to_float32(recorded[start:end], self.sample_rate)
+
+    @property
+    def seconds(self):
+        return self._samples / self.sample_rate
+
+    # --- Decoding ---
+    def _decode(self, start, end, trim=False):
+        audio = self.audio(start, end)
+        # Silent windows are skipped (Whisper tends to invent text for them).
+        if not has_speech(audio):
+            return {"text": "", "segments": []}
+        if trim:
+            audio = trim_silence(audio)
+        prompt = " ".join(self._committed)[-200:] or None
+        return transcribe_array(self.model, audio, initial_prompt=prompt, condition_on_previous_text=False)
+
+    def _commit_window(self):
+        start = self._committed_samples
+        result = self._decode(start, start + self.window)
+        cutoff = (self.window - self.overlap) / self.sample_rate
+        segments = result.get("segments") or []
+        done = [segment for segment in segments if segment["end"] <= cutoff]
+        if done:
+            pending = segments[len(done):]
+            next_start = start + int(done[-1]["end"] * self.sample_rate)
+        else:
+            # One segment spans the whole window; take it as is.
+            done, pending, next_start = segments, [], start + self.window
+        if next_start <= start:
+            next_start = start + self.window - self.overlap
+        with self._lock:
+            self._committed.extend(segment["text"].strip() for segment in done if segment["text"].strip())
+            self._committed_samples = next_start
+            self._tentative = " ".join(segment["text"].strip() for segment in pending)
+            self._partial_end = self._samples
+
+    def _preview(self, end):
+        result = self._decode(self._committed_samples, end, trim=True)
+        with self._lock:
+            self._tentative = result["text"].strip()
+            self._partial_end = end
+
+    def _run(self):
+        try:
+            while not self._stopping.is_set():
+                available = self._samples
+                if available - self._committed_samples >= self.window:
+                    self._commit_window()
+                elif available - self._partial_end >= self.partial_every:
+                    self._preview(available)
+                else:
+                    time.sleep(0.2)
+        except Exception as e:
+            logging.exception("Live transcription failed")
+            self.error = e
+
+    def text(self):
+        """Committed text plus the current tentative tail."""
+        with self._lock:
+            return " ".join(self._committed + ([self._tentative] if self._tentative else []))
+
+    def stop(self):
+        """Stop recording and decode what follows the last committed segment; returns the final text."""
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._samples > self._committed_samples:
+            result = self._decode(self._committed_samples, self._samples, trim=True)
+            with self._lock:
+                if result["text"].strip():
+                    self._committed.append(result["text"].strip())
+                self._committed_samples = self._samples
+                self._tentative = ""
+        return self.text()
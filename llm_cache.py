@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# ------------------ LLM Response Cache ------------------
+# Responses are stored in a local SQLite file keyed by a hash of the normalized
+# inputs, the model name and the prompt template, so editing a prompt
+# automatically stops serving answers produced by the old one. Entries expire
+# after a TTL and the least recently used ones are evicted past max_entries.
+DEFAULT_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", "document_store/llm_cache.sqlite")
+DEFAULT_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "20000"))
+DEFAULT_TTL_SECONDS = float(os.environ.get("LLM_CACHE_TTL", str(30 * 24 * 3600)))
+
+def normalize_text(text):
+    return " ".join(str(text).split())
+
+def make_cache_key(kind, model, template, **inputs):
+    payload = json.dumps({
+        "kind": kind,
+        "model": model,
+        "template": hashlib.sha256(template.encode("utf-8")).hexdigest(),
+        "inputs": {name: normalize_text(value) for name, value in sorted(inputs.items())},
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LLMResponseCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_access ON llm_cache (last_access)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "writes": 0}
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            value, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.stats["hits"] += 1
+        return json.loads(value)
+
+    def set(self, key, value, kind=""):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, kind, value, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, json.dumps(value), now, now)
+            )
+            self.stats["writes"] += 1
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        if self.ttl_seconds:
+            expired = self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+            ).rowcount
+            self.stats["expired"] += expired
+        count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if count > self.max_entries:
+            evicted = self._conn.execute("""
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY last_access LIMIT ?
+                )
+            """, (count - self.max_entries,)).rowcount
+            self.stats["evictions"] += evicted
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def get_stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            stats = dict(self.stats, entries=entries, max_entries=self.max_entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_llm_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMResponseCache()
+    return _cache
@@ -0,0 +1,183 @@
+import os
+import random
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import ollama
+from model_sessions import get_model_sessions
+
+# ------------------ Bounded Ollama Client ------------------
+# One client per process. A semaphore caps how many chat requests are in flight
+# against the Ollama server (from page threads and batch jobs alike); requests
+# that time out or hit a transient server error are retried with exponential
+# backoff.
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "4"))
+DEFAULT_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "120"))
+DEFAULT_RETRIES = int(os.environ.get("LLM_RETRIES", "2"))
+DEFAULT_BACKOFF = float(os.environ.get("LLM_BACKOFF", "1.0"))
+
+class OllamaPool:
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, timeout=DEFAULT_TIMEOUT,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, host=None):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._client = ollama.Client(host=host, timeout=timeout)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="ollama")
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "in_flight": 0, "total_seconds": 0.0}
+
+    @staticmethod
+    def _is_retryable(error):
+        if isinstance(error, ollama.ResponseError):
+            return error.status_code >= 500 or error.status_code == 429
+        return isinstance(error, (httpx.TimeoutException, httpx.TransportError))
+
+    def _count(self, key, value=1):
+        with self._stats_lock:
+            self.stats[key] += value
+
+    @staticmethod
+    def _with_keep_alive(workload, kwargs):
+        if workload is not None:
+            kwargs.setdefault("keep_alive", get_model_sessions().keep_alive(workload))
+        return kwargs
+
+    @staticmethod
+    def _load_seconds(response):
+        load_duration = response.get("load_duration")
+        return load_duration / 1e9 if load_duration is not None else None
+
+    def chat(self, workload=None, **kwargs):
+        """ollama chat; workload selects the keep-alive and the latency bucket in model_sessions."""
+        kwargs = self._with_keep_alive(workload, kwargs)
+        attempt = 0
+        while True:
+            with self._slots:
+                self._count("in_flight")
+                start = time.perf_counter()
+                try:
+                    response = self._client.chat(**kwargs)
+                    self._count("requests")
+                    get_model_sessions().record(
+                        workload, kwargs.get("model"), time.perf_counter() - start,
+                        self._load_seconds(response), kwargs.get("keep_alive")
+                    )
+                    return response
+                except Exception as e:
+                    error = e
+                finally:
+                    self._count("in_flight", -1)
+                    self._count("total_seconds", time.perf_counter() - start)
+
+            self._backoff(attempt, error)
+            attempt += 1
+
+    def _backoff(self, attempt, error):
+        """Sleep before retry attempt + 1, or re-raise error when it should not be retried."""
+        if attempt >= self.retries or not self._is_retryable(error):
+            self._count("failures")
+            raise error
+        delay = self.backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+        self._count("retries")
+        logging.warning(f"Ollama request failed ({error}); retry {attempt + 1}/{self.retries} in {delay:.1f}s")
+        time.sleep(delay)
+
+    def chat_stream(self, workload=None, **kwargs):
+        """Like chat(stream=True), holding a slot until the stream is exhausted or closed.
+
+        Only failures before the first chunk are retried; closing the generator
+        early closes the HTTP response, which stops generation on the server.
+        Latency is recorded as the time to the first chunk.
+        """
+        kwargs = self._with_keep_alive(workload, kwargs)
+        attempt = 0
+        while True:
+            with self._slots:
+                self._count("in_flight")
+                start = time.perf_counter()
+                received = False
+                first_chunk_seconds = None
+                stream = None
+                try:
+                    stream = self._client.chat(stream=True, **kwargs)
+                    for chunk in stream:
+                        if not received:
+                            received = True
+                            first_chunk_seconds = time.perf_counter() - start
+                        if chunk.get("done"):
+                            # Only the final chunk reports load_duration.
+                            get_model_sessions().record(
+                                workload, kwargs.get("model"), first_chunk_seconds,
+                                self._load_seconds(chunk), kwargs.get("keep_alive")
+                            )
+                            first_chunk_seconds = None
+                        yield chunk
+                    self._count("requests")
+                    return
+                except GeneratorExit:
+                    self._count("requests")
+                    raise
+                except Exception as e:
+                    if received:
+                        self._count("failures")
+                        raise
+                    error = e
+                finally:
+                    if stream is not None:
+                        stream.close()
+                    if first_chunk_seconds is not None:
+                        get_model_sessions().record(
+                            workload, kwargs.get("model"), first_chunk_seconds, None, kwargs.get("keep_alive")
+                        )
+                    self._count("in_flight", -1)
+                    self._count("total_seconds", time.perf_counter() - start)
+
+            self._backoff(attempt, error)
+            attempt += 1
+
+    def submit(self, fn, *args, **kwargs):
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def map(self, fn, items):
+        """Run fn(*item) for each item concurrently; failures come back as the exception."""
+        futures = [self._executor.submit(fn, *item) for item in items]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def get_stats(self):
+        with self._stats_lock:
+            return dict(self.stats, max_concurrency=self.max_concurrency)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_llm_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = OllamaPool()
+    return _pool
+
+def configure_llm_pool(**kwargs):
+    """Replace the process-wide pool, e.g. with a larger limit for a batch job."""
+    global _pool
+    with _pool_lock:
+        old, _pool = _pool, OllamaPool(**kwargs)
+    if old is not None:
+        old.shutdown()
+    return _pool
@@ -0,0 +1,257 @@
+import json
+import logging
+import re
+from llm_client import get_llm_pool
+
+# ------------------ JSON Extraction ------------------
+# Model answers wrap their JSON in <think> blocks, code fences and prose. The
+# scanner below walks the text tracking string state and a bracket stack and
+# finds top-level {...} / [...] spans; each span is parsed (with a few cheap
+# textual repairs) and checked against the schema of the expected answer. A
+# span that does not close or parse is searched again from its next bracket,
+# reusing what the first scan learned about the brackets inside it, so the
+# work stays linear in the length of the answer. Only when nothing in the
+# response validates is the model asked, with a short prompt, to rewrite its
+# own answer as JSON.
+THINK_BLOCK = re.compile(r"<think>.*?(</think>|$)", re.DOTALL)
+OPENING_BRACKET = re.compile(r"[{\[]")
+REPAIR_NUM_PREDICT = 512
+# How many balanced spans, each inside the last, are tried after their
+# enclosing span failed to parse; deeper ones are skipped.
+MAX_NESTED_RETRIES = 32
+
+REPAIR_PROMPT = """
+Rewrite the following text as valid JSON only, with no explanation and no code fences.
+The JSON must have this shape:
+{example}
+
+Text:
+{text}
+"""
+
+class JsonExtractionError(ValueError):
+    pass
+
+def strip_reasoning(text):
+    return THINK_BLOCK.sub("", text or "")
+
+def _next_span(text, begin=0, fates=None):
+    """(start, span, end) of the first JSON object/array at or after begin, or None.
+
+    Scans from the next opening bracket, tracking string state and a bracket
+    stack. A span still open when the text ends (a truncated answer) comes
+    back with the missing closing brackets appended and end=None; a span cut
+    short by a mismatched closing bracket is passed over. fates, shared by the
+    calls on one text, records for every bracket a scan went through where its
+    span ends (None if it never closes), so later calls starting inside a span
+    look brackets up instead of scanning the same text again.
+    """
+    fates = {} if fates is None else fates
+    closers = {"{": "}", "[": "]"}
+    position = begin
+    while True:
+        match = OPENING_BRACKET.search(text, position)
+        if match is None:
+            return None
+        start = match.start()
+        if start in fates:
+            if fates[start] is not None:
+                return start, text[start:fates[start]], fates[start]
+            position = start + 1
+            continue
+        stack = []
+        in_string = escaped = False
+        for position in range(start, len(text)):
+            char = text[position]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char in closers:
+                stack.append((position, closers[char]))
+            elif char in "}]":
+                opened, closer = stack.pop()
+                if char != closer:
+                    # Neither this bracket nor any still open around it can close.
+                    fates[opened] = None
+                    fates.update((opened, None) for opened, _ in stack)
+                    break
+                fates[opened] = position + 1
+                if not stack:
+                    return start, text[start:position + 1], position + 1
+        else:
+            fates.update((opened, None) for opened, _ in stack)
+            tail = text[start:]
+            if in_string:
+                tail += '"'
+            return start, tail + "".join(closer for _, closer in reversed(stack)), None
+        position = start + 1
+
+def iter_json_spans(text):
+    """Yield candidate top-level JSON object/array substrings in order.
+
+    After a balanced span the scan continues behind it; after one that never
+    closes it continues at the next bracket inside it, so a stray "{" in prose
+    cannot swallow the real object that follows. Only the outermost of a run
+    of unclosed brackets is yielded (completed); the ones inside it are skipped.
+    """
+    fates = {}
+    position = 0
+    while True:
+        found = _next_span(text, position, fates)
+        if found is None:
+            return
+        start, span, end = found
+        yield span
+        position = end if end is not None else start + 1
+
+def _repairs(span):
+    yield span
+    fixed = re.sub(r'"\s*\.,', '",', span)                       # "text".,  ->  "text",
+    fixed = re.sub(r",\s*([\]}])", r"\1", fixed)                  # trailing commas
+    fixed = fixed.replace("“", '"').replace("”", '"')   # curly quotes
+    if fixed != span:
+        yield fixed
+
+def _loads(span):
+    for candidate in _repairs(span):
+        try:
+            return json.loads(candidate)
+        except (ValueError, RecursionError):
+            # RecursionError: nested deeper than the decoder can follow.
+            continue
+    raise JsonExtractionError("not valid JSON")
+
+# ------------------ Schemas ------------------
+def _number(value, name, low, high, integer=False):
+    if isinstance(value, str):
+        match = re.match(r"\s*(-?\d+(?:\.\d+)?)\s*%?\s*$", value)
+        if not match:
+            raise JsonExtractionError(f"{name} is not a number")
+        value = float(match.group(1))
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise JsonExtractionError(f"{name} is not a number")
+    value = min(max(value, low), high)
+    return int(round(value)) if integer else value
+
+def validate_evaluation(value):
+    if not isinstance(value, dict):
+        raise JsonExtractionError("evaluation must be an object")
+    missing = [name for name in ("correctness", "completeness", "relevance", "depth") if name not in value]
+    if missing:
+        raise JsonExtractionError(f"evaluation is missing {', '.join(missing)}")
+    return dict(
+        value,
+        correctness=_number(value["correctness"], "correctness", 0, 1, integer=True),
+        completeness=_number(value["completeness"], "completeness", 0, 100),
+        relevance=_number(value["relevance"], "relevance", 0, 100),
+        depth=_number(value["depth"], "depth", 0, 100),
+    )
+
+def validate_feedback(value):
+    if not isinstance(value, dict) or not isinstance(value.get("explanation"), str) or not value["explanation"].strip():
+        raise JsonExtractionError("feedback must be an object with a non-empty explanation")
+    return value
+
+def validate_qa_list(value):
+    # Accept {"questions": [...]} style wrappers around the list.
+    if isinstance(value, dict):
+        lists = [item for item in value.values() if isinstance(item, list)]
+        if len(lists) != 1:
+            raise JsonExtractionError("expected a list of question/answer objects")
+        value = lists[0]
+    if not isinstance(value, list):
+        raise JsonExtractionError("expected a list of question/answer objects")
+    pairs = [
+        {**item, "question": str(item["question"]).strip(), "answer": str(item["answer"]).strip()}
+        for item in value
+        if isinstance(item, dict) and str(item.get("question") or "").strip() and str(item.get("answer") or "").strip()
+    ]
+    if value and not pairs:
+        raise JsonExtractionError("no item has both a question and an answer")
+    return pairs
+
+SCHEMAS = {
+    "evaluation": (validate_evaluation, '{"correctness": 1, "completeness": 60, "relevance": 70, "depth": 40}'),
+    "feedback": (validate_feedback, '{"explanation": "..."}'),
+    "qa_list": (validate_qa_list, '[{"question": "What is ...?", "answer": "..."}]'),
+}
+
+# ------------------ Extraction ------------------
+def extract_json(text, schema):
+    """Return the first JSON value in text that validates against SCHEMAS[schema].
+
+    Text outside <think> blocks is searched first, then the reasoning itself.
+    Raises JsonExtractionError with the last reason when nothing validates.
+    """
+    validate = SCHEMAS[schema][0]
+    error = JsonExtractionError("no JSON found in response")
+    visible = strip_reasoning(text)
+    sources = [visible] if visible == text else [visible, text or ""]
+    for source in sources:
+        fates = {}
+        failed_ends = []
+        position = 0
+        while True:
+            found = _next_span(source, position, fates)
+            if found is None:
+                break
+            start, span, end = found
+            while failed_ends and failed_ends[-1] <= start:
+                failed_ends.pop()
+            if end is not None and len(failed_ends) >= MAX_NESTED_RETRIES:
+                # Deeply nested junk: do not parse it once per level.
+                position = end
+                continue
+            try:
+                value = _loads(span)
+            except JsonExtractionError as e:
+                # Not JSON (e.g. a "{" quoted in prose); look again inside it.
+                error = e
+                if end is not None:
+                    failed_ends.append(end)
+                position = start + 1
+                continue
+            try:
+                return validate(value)
+            except JsonExtractionError as e:
+                error = e
+            position = end if end is not None else start + 1
+    raise error
+
+def try_extract_json(text, schema):
+    try:
+        return extract_json(text, schema)
+    except JsonExtractionError as e:
+        logging.debug(f"No valid {schema} JSON in response: {e}")
+        return None
+
+def repair_json(text, schema, model, workload=None):
+    """One short re-prompt asking the model to restate text as schema-shaped JSON."""
+    prompt = REPAIR_PROMPT.format(example=SCHEMAS[schema][1], text=strip_reasoning(text).strip() or text)
+    response = get_llm_pool().chat(
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        workload=workload,
+        options={"temperature": 0, "num_predict": REPAIR_NUM_PREDICT}
+    )
+    return extract_json(response["message"]["content"], schema)
+
+def parse_or_repair(text, schema, model, workload=None):
+    """extract_json, falling back to a single repair request; returns None if both fail."""
+    try:
+        return extract_json(text, schema)
+    except JsonExtractionError as e:
+        if not (text or "").strip():
+            return None
+        logging.warning(f"Invalid {schema} JSON ({e}); asking the model to repair it")
+    try:
+        return repair_json(text, schema, model, workload)
+    except Exception as e:
+        logging.error(f"JSON repair for {schema} failed: {e}")
+        return None
@@ -0,0 +1,196 @@
+import json
+import logging
+import re
+import time
+from llm_client import get_llm_pool
+
+# ------------------ Streaming JSON Responses ------------------
+# deepseek-r1 writes a <think> block before its answer, and our prompts ask for a
+# single JSON object. Streaming lets the pages show the answer as soon as it
+# starts: reasoning is dropped chunk by chunk, the JSON object is tracked by
+# brace depth (ignoring braces inside strings), and the request is closed as
+# soon as the object's closing brace arrives instead of waiting for the model
+# to finish whatever it writes after it.
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+def _partial_tag(text, tag):
+    """Length of the longest suffix of text that could be the start of tag."""
+    for size in range(min(len(tag) - 1, len(text)), 0, -1):
+        if tag.startswith(text[-size:]):
+            return size
+    return 0
+
+class ThinkFilter:
+    """Removes <think>...</think> blocks from streamed text, even when tags are split across chunks."""
+    def __init__(self):
+        self.thinking = False
+        self._buffer = ""
+
+    def feed(self, text):
+        self._buffer += text
+        visible = []
+        while self._buffer:
+            if self.thinking:
+                end = self._buffer.find(THINK_CLOSE)
+                if end < 0:
+                    keep = _partial_tag(self._buffer, THINK_CLOSE)
+                    self._buffer = self._buffer[len(self._buffer) - keep:]
+                    break
+                self._buffer = self._buffer[end + len(THINK_CLOSE):]
+                self.thinking = False
+            else:
+                start = self._buffer.find(THINK_OPEN)
+                if start < 0:
+                    keep = _partial_tag(self._buffer, THINK_OPEN)
+                    visible.append(self._buffer[:len(self._buffer) - keep])
+                    self._buffer = self._buffer[len(self._buffer) - keep:]
+                    break
+                visible.append(self._buffer[:start])
+                self._buffer = self._buffer[start + len(THINK_OPEN):]
+                self.thinking = True
+        return "".join(visible)
+
+    def flush(self):
+        text, self._buffer = ("" if self.thinking else self._buffer), ""
+        return text
+
+class JsonObjectTracker:
+    """Collects the first top-level JSON object from streamed text."""
+    def __init__(self):
+        self.text = ""
+        self.started = False
+        self.complete = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text):
+        if self.complete:
+            return
+        if not self.started:
+            start = text.find("{")
+            if start < 0:
+                return
+            text = text[start:]
+            self.started = True
+        for position, char in enumerate(text):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.text += text[:position + 1]
+                    self.complete = True
+                    return
+        self.text += text
+
+    def parse(self):
+        if not self.complete:
+            return None
+        try:
+            return json.loads(self.text)
+        except json.JSONDecodeError as e:
+            logging.error(f"JSON decode error in streamed response: {e}")
+            return None
+
+    def partial_string(self, field):
+        """Decoded value of a string field as far as it has arrived, or None if it has not started."""
+        match = re.search(r'"' + re.escape(field) + r'"\s*:\s*"', self.text)
+        if not match:
+            return None
+        value = []
+        position = match.end()
+        while position < len(self.text):
+            char = self.text[position]
+            if char == '"':
+                break
+            if char == "\\":
+                escape = self.text[position + 1:position + 2]
+                if not escape:
+                    break
+                if escape == "u":
+                    digits = self.text[position + 2:position + 6]
+                    if len(digits) < 4:
+                        break
+                    try:
+                        value.append(chr(int(digits, 16)))
+                    except ValueError:
+                        pass
+                    position += 6
+                    continue
+                value.append({"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}.get(escape, escape))
+                position += 2
+                continue
+            value.append(char)
+            position += 1
+        return "".join(value)
+
+class StreamedJson:
+    """State of one streamed response: raw and visible text, the JSON object and first-token timings."""
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.first_token_seconds = None
+        self.first_visible_seconds = None
+        self.text = ""  # everything received, <think> blocks included
+        self.visible = ""
+        self._think = ThinkFilter()
+        self.json = JsonObjectTracker()
+
+    @property
+    def thinking(self):
+        return self._think.thinking
+
+    @property
+    def complete(self):
+        return self.json.complete
+
+    def feed(self, text):
+        if self.first_token_seconds is None and text:
+            self.first_token_seconds = time.perf_counter() - self.started_at
+        self.text += text
+        visible = self._think.feed(text)
+        if visible:
+            if self.first_visible_seconds is None and visible.strip():
+                self.first_visible_seconds = time.perf_counter() - self.started_at
+            self.visible += visible
+            self.json.feed(visible)
+
+    def finish(self):
+        visible = self._think.flush()
+        self.visible += visible
+        self.json.feed(visible)
+
+def stream_json(model, prompt, workload=None, **kwargs):
+    """Stream a chat completion, yielding the StreamedJson state after every chunk.
+
+    The request is closed once the first JSON object in the answer is complete.
+    """
+    state = StreamedJson()
+    stream = get_llm_pool().chat_stream(
+        model=model, messages=[{"role": "user", "content": prompt}], workload=workload, **kwargs
+    )
+    try:
+        for chunk in stream:
+            state.feed(chunk["message"]["content"])
+            yield state
+            if state.complete:
+                break
+        else:
+            state.finish()
+            yield state
+    finally:
+        stream.close()
+        logging.debug(
+            f"{model} stream: first token {state.first_token_seconds}s, "
+            f"first answer token {state.first_visible_seconds}s, complete={state.complete}"
+        )
@@ -1,30 +1,23 @@
 # login.py
 import streamlit as st
-import psycopg2
+from db import get_connection
 import hashlib
 
-def get_connection():
-    return psycopg2.connect(
-        host="localhost", dbname="llmqa",
-        user="postgres", password="postgres", port="5432"
-    )
-
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
 def login_user(username, password):
-    conn = get_connection()
-    cur = conn.cursor()
     hashed = hash_password(password)
 
-    cur.execute("""
-        SELECT user_id, role FROM users
-        WHERE username = %s AND password = %s AND is_active = TRUE
-    """, (username, hashed))
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT user_id, role FROM users
+            WHERE username = %s AND password = %s AND is_active = TRUE
+        """, (username, hashed))
 
-    result = cur.fetchone()
-    cur.close()
-    conn.close()
+        result = cur.fetchone()
+        cur.close()
     return result
 
 def app():
@@ -0,0 +1,131 @@
+import logging
+import os
+import re
+import threading
+import time
+
+# ------------------ Model Sessions ------------------
+# Central place for how long Ollama keeps each model resident. Every request
+# names its workload (feedback, evaluation, generation, embedding) and gets that
+# workload's keep_alive, so one caller can no longer unload the model the others
+# are about to use. The manager also pre-warms models at startup and records
+# each request as cold (the model had to be loaded) or warm, so the cost of a
+# load shows up in get_stats().
+#
+# Set with LLM_KEEP_ALIVE and LLM_KEEP_ALIVE_<WORKLOAD>; OLLAMA_KEEP_ALIVE is left
+# to the Ollama server. Values are seconds or durations like "30m" or "1h30m".
+DEFAULT_MODEL = "deepseek-r1:1.5b"
+FALLBACK_KEEP_ALIVE = 1800
+WORKLOADS = ("feedback", "evaluation", "generation", "embedding")
+# Responses that spent longer than this loading the model count as cold.
+COLD_LOAD_SECONDS = 0.5
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+
+def parse_keep_alive(value, default=FALLBACK_KEEP_ALIVE):
+    """Seconds from "1800", "-1", "30m", "1h30m" or "0.5h"; default (with a warning) if malformed."""
+    text = str(value).strip().lower()
+    try:
+        return int(float(text))
+    except (ValueError, OverflowError):
+        pass
+    sign = -1 if text.startswith("-") else 1
+    body = text.lstrip("+-")
+    if body and DURATION_PART.sub("", body) == "":
+        return sign * int(sum(float(number) * DURATION_UNITS[unit] for number, unit in DURATION_PART.findall(body)))
+    logging.warning(f"Ignoring invalid keep-alive {value!r}; using {default}s")
+    return default
+
+def _keep_alive_from_env(workload, default):
+    value = os.environ.get(f"LLM_KEEP_ALIVE_{workload.upper()}")
+    return default if value is None else parse_keep_alive(value, default)
+
+DEFAULT_KEEP_ALIVE = parse_keep_alive(os.environ.get("LLM_KEEP_ALIVE", FALLBACK_KEEP_ALIVE))
+
+class ModelSessionManager:
+    def __init__(self, keep_alive=None, prewarm_models=(DEFAULT_MODEL,)):
+        # keep_alive values are seconds; a negative value keeps the model loaded indefinitely.
+        self._keep_alive = {workload: _keep_alive_from_env(workload, DEFAULT_KEEP_ALIVE) for workload in WORKLOADS}
+        self._keep_alive.update(keep_alive or {})
+        self.prewarm_models = prewarm_models
+        self._resident_until = {}
+        self._prewarmed = False
+        self._lock = threading.Lock()
+        self.stats = {}
+
+    def keep_alive(self, workload):
+        return self._keep_alive.get(workload, DEFAULT_KEEP_ALIVE)
+
+    def set_keep_alive(self, workload, seconds):
+        with self._lock:
+            self._keep_alive[workload] = seconds
+
+    # --- Residency ---
+    def _expect_resident(self, model):
+        until = self._resident_until.get(model)
+        return until is not None and time.monotonic() < until
+
+    def _touch(self, model, keep_alive):
+        self._resident_until[model] = float("inf") if keep_alive < 0 else time.monotonic() + keep_alive
+
+    def record(self, workload, model, seconds, load_seconds=None, keep_alive=None):
+        """Record one request; without a reported load time, residency is inferred from keep-alive."""
+        workload = workload or "default"
+        with self._lock:
+            if load_seconds is not None:
+                cold = load_seconds > COLD_LOAD_SECONDS
+            else:
+                cold = not self._expect_resident(model)
+            stats = self.stats.setdefault(workload, {
+                "cold": 0, "warm": 0, "cold_seconds": 0.0, "warm_seconds": 0.0, "load_seconds": 0.0,
+            })
+            kind = "cold" if cold else "warm"
+            stats[kind] += 1
+            stats[f"{kind}_seconds"] += seconds
+            stats["load_seconds"] += load_seconds or 0.0
+            self._touch(model, self.keep_alive(workload) if keep_alive is None else keep_alive)
+
+    def get_stats(self):
+        """Per-workload counts and mean latency (seconds) for cold and warm requests."""
+        with self._lock:
+            result = {}
+            for workload, stats in self.stats.items():
+                result[workload] = dict(
+                    stats,
+                    cold_mean=stats["cold_seconds"] / stats["cold"] if stats["cold"] else None,
+                    warm_mean=stats["warm_seconds"] / stats["warm"] if stats["warm"] else None,
+                    keep_alive=self.keep_alive(workload),
+                )
+            return result
+
+    # --- Pre-warming ---
+    def prewarm(self, models=None, workload="feedback"):
+        """Load models now (a chat with no messages only loads the model)."""
+        from llm_client import get_llm_pool
+        for model in models or self.prewarm_models:
+            start = time.perf_counter()
+            try:
+                get_llm_pool().chat(model=model, messages=[], workload=workload)
+                logging.info(f"Pre-warmed {model} in {time.perf_counter() - start:.1f}s")
+            except Exception as e:
+                logging.warning(f"Could not pre-warm {model}: {e}")
+
+    def prewarm_once(self):
+        """Start a background pre-warm the first time it is called in this process."""
+        with self._lock:
+            if self._prewarmed:
+                return
+            self._prewarmed = True
+        threading.Thread(target=self.prewarm, name="ollama-prewarm", daemon=True).start()
+
+
+_sessions = None
+_sessions_lock = threading.Lock()
+
+def get_model_sessions():
+    global _sessions
+    if _sessions is None:
+        with _sessions_lock:
+            if _sessions is None:
+                _sessions = ModelSessionManager()
+    return _sessions
@@ -0,0 +1,59 @@
+import streamlit as st
+from db import get_connection
+from question_catalog import QUESTION_COLUMNS
+
+# ------------------ Keyset Pagination ------------------
+# Pages are addressed by the last id already shown instead of OFFSET, so every
+# page costs one indexed range scan no matter how deep the admin has paged.
+# The topic filter runs in SQL and only the visible page is turned into widgets.
+PAGE_SIZE = 10
+
+def fetch_question_page(topic=None, after_id=None, page_size=PAGE_SIZE, descending=False):
+    conditions, params = [], []
+    if topic:
+        conditions.append("topic_name = %s")
+        params.append(topic)
+    if after_id is not None:
+        conditions.append("id < %s" if descending else "id > %s")
+        params.append(after_id)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    order = "DESC" if descending else "ASC"
+    # One extra row tells us whether a next page exists.
+    params.append(page_size + 1)
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"SELECT {', '.join(QUESTION_COLUMNS)} FROM public.questions {where} ORDER BY id {order} LIMIT %s",
+            params
+        )
+        rows = [dict(zip(QUESTION_COLUMNS, row)) for row in cur.fetchall()]
+        cur.close()
+    return rows[:page_size], len(rows) > page_size
+
+# ------------------ Page State ------------------
+def _next_page(key, last_id):
+    st.session_state[key]["cursors"].append(last_id)
+
+def _previous_page(key):
+    if len(st.session_state[key]["cursors"]) > 1:
+        st.session_state[key]["cursors"].pop()
+
+def paginate_questions(key, topic=None, page_size=PAGE_SIZE, descending=False):
+    """Fetch the current page for this widget key; resets to page 1 when the topic changes."""
+    state = st.session_state.get(key)
+    if state is None or state["topic"] != topic:
+        state = st.session_state[key] = {"topic": topic, "cursors": [None]}
+    return fetch_question_page(topic, state["cursors"][-1], page_size, descending)
+
+def render_page_controls(key, rows, has_next):
+    cursors = st.session_state[key]["cursors"]
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button("⬅️ Previous", key=f"{key}_prev", disabled=len(cursors) == 1,
+                  on_click=_previous_page, args=(key,))
+    with col2:
+        st.caption(f"Page {len(cursors)}")
+    with col3:
+        st.button("Next ➡️", key=f"{key}_next", disabled=not has_next or not rows,
+                  on_click=_next_page, args=(key, rows[-1]["id"] if rows else None))
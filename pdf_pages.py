@@ -0,0 +1,72 @@
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pdfplumber
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# ------------------ PDF Pages ------------------
+# Page-at-a-time extraction producing the same per-page Documents as
+# PDFPlumberLoader (page, source, file_path, total_pages), so the splitter
+# assigns the same start_index values.
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+PDF_PARSE_WORKERS = int(os.environ.get("PDF_PARSE_WORKERS", str(os.cpu_count() or 1)))
+# Below this many pages a process pool costs more than it saves.
+MIN_PAGES_PER_RANGE = 8
+
+def page_document(page, file_path, total_pages):
+    return Document(
+        page_content=page.extract_text() or "",
+        metadata={
+            "source": file_path,
+            "file_path": file_path,
+            "page": page.page_number - 1,
+            "total_pages": total_pages,
+        }
+    )
+
+def iter_pdf_pages(file_path, first_page=0, last_page=None):
+    """Yield one Document per page; only the current page is held in memory."""
+    with pdfplumber.open(file_path) as pdf:
+        total_pages = len(pdf.pages)
+        last_page = total_pages if last_page is None else min(last_page, total_pages)
+        for number in range(first_page, last_page):
+            page = pdf.pages[number]
+            yield page_document(page, file_path, total_pages)
+            # pdfplumber caches parsed objects on the page; drop them as we go.
+            page.flush_cache()
+
+def count_pdf_pages(file_path):
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+# ------------------ Parallel Extraction ------------------
+def page_ranges(total_pages, workers, min_pages=MIN_PAGES_PER_RANGE):
+    """Split [0, total_pages) into contiguous ranges, about two per worker for load balance."""
+    if total_pages <= 0:
+        return []
+    count = max(1, min(workers * 2, total_pages // min_pages))
+    size = -(-total_pages // count)
+    return [(first, min(first + size, total_pages)) for first in range(0, total_pages, size)]
+
+def _extract_range(file_path, first_page, last_page):
+    return list(iter_pdf_pages(file_path, first_page, last_page))
+
+def iter_pdf_pages_parallel(file_path, workers=PDF_PARSE_WORKERS):
+    """Yield page Documents in page order while ranges are extracted across a process pool."""
+    total_pages = count_pdf_pages(file_path)
+    ranges = page_ranges(total_pages, workers)
+    if workers <= 1 or len(ranges) <= 1:
+        yield from iter_pdf_pages(file_path)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), mp_context=mp.get_context("spawn")) as pool:
+        futures = [pool.submit(_extract_range, file_path, first, last) for first, last in ranges]
+        for future in futures:
+            yield from future.result()
+
+def chunk_documents(raw_documents):
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, add_start_index=True
+    ).split_documents(raw_documents)
@@ -0,0 +1,195 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from bulk_writer import BulkWriter, DEFAULT_METHOD
+from db import get_connection
+from dedup_index import DuplicateIndex, DEFAULT_JACCARD_THRESHOLD, get_duplicate_index
+from llm_client import get_llm_pool
+from llm_json import parse_or_repair, try_extract_json
+from question_catalog import get_question_catalog
+
+# ------------------ Bulk Question-Bank Generation ------------------
+# Walks every chunk of an indexed document (grouped group_size consecutive
+# chunks per prompt), sends the generation requests concurrently through the
+# shared Ollama pool, drops near-duplicate questions and streams accepted pairs
+# into the questions table with multi-row inserts as they arrive. Each job runs
+# its prompts on its own small executor, at most one fewer than the pool's
+# limit, so interactive grading always finds a free slot.
+GENERATION_MODEL = "deepseek-r1:1.5b"
+DEFAULT_CONCURRENCY = int(os.environ.get("QUESTION_BANK_CONCURRENCY", "2"))
+DEFAULT_GROUP_SIZE = 2
+DEFAULT_INSERT_BATCH = 50
+DEFAULT_SIMILARITY_THRESHOLD = DEFAULT_JACCARD_THRESHOLD
+QUESTION_INSERT_COLUMNS = ["topic_name", "question", "answer", "created_by", "created_at"]
+
+# ------------------ Generation Prompt ------------------
+PROMPT_TEMPLATE = """
+You are an expert assistant generating question-answer pairs from the given context.
+Return the output in JSON format as a list of objects. Each object must have a "question" and an "answer" field.
+If the context lacks clarity, return an empty list.
+
+Context:
+{document_context}
+
+Respond only in this JSON format:
+[
+  {{
+    "question": "What is ...?",
+    "answer": "..."
+  }},
+  ...
+]
+"""
+
+def extract_json_from_response(response):
+    """Validated list of {"question", "answer"} pairs from a model response, or None."""
+    return try_extract_json(response, "qa_list")
+
+def chunk_groups(chunks, group_size=DEFAULT_GROUP_SIZE):
+    group_size = max(1, group_size)
+    return [chunks[start:start + group_size] for start in range(0, len(chunks), group_size)]
+
+def generate_pairs(context_text):
+    response = get_llm_pool().chat(
+        model=GENERATION_MODEL,
+        workload="generation",
+        messages=[{"role": "user", "content": PROMPT_TEMPLATE.format(document_context=context_text)}]
+    )
+    return parse_or_repair(response['message']['content'], "qa_list", GENERATION_MODEL, workload="generation") or []
+
+# ------------------ Duplicate Filter ------------------
+class QuestionDeduplicator:
+    """Rejects questions that near-duplicate a stored question of the topic or one accepted earlier in the job."""
+    def __init__(self, topic, threshold=DEFAULT_SIMILARITY_THRESHOLD):
+        self.stored = get_duplicate_index(topic)
+        self._accepted = DuplicateIndex(jaccard_threshold=threshold)
+
+    def add(self, question):
+        """Remember the question and return True unless it repeats one already seen."""
+        if self.stored.query(question):
+            return False
+        return self._accepted.add_if_new(len(self._accepted), question) is None
+
+# ------------------ Job ------------------
+class QuestionBankJob:
+    def __init__(self, index, document_hash, namespace, topic, created_by="admin",
+                 group_size=DEFAULT_GROUP_SIZE, max_questions=None, insert_batch=DEFAULT_INSERT_BATCH,
+                 similarity_threshold=DEFAULT_SIMILARITY_THRESHOLD, write_method=DEFAULT_METHOD, on_conflict=None,
+                 concurrency=DEFAULT_CONCURRENCY):
+        self.id = uuid.uuid4().hex
+        self.index = index
+        self.document_hash = document_hash
+        self.namespace = namespace
+        self.topic = topic
+        self.created_by = created_by
+        self.group_size = group_size
+        self.max_questions = max_questions
+        self.insert_batch = insert_batch
+        self.similarity_threshold = similarity_threshold
+        self.write_method = write_method
+        self.on_conflict = on_conflict
+        self.concurrency = concurrency
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.progress = {
+            "status": "queued", "groups_total": 0, "groups_done": 0, "generated": 0,
+            "duplicates": 0, "saved": 0, "failed_groups": 0, "error": None,
+        }
+
+    def _update(self, **changes):
+        with self._lock:
+            for key, value in changes.items():
+                if key in ("groups_done", "generated", "duplicates", "saved", "failed_groups"):
+                    self.progress[key] += value
+                else:
+                    self.progress[key] = value
+
+    def get_progress(self):
+        with self._lock:
+            return dict(self.progress)
+
+    def _generate(self, context_text):
+        # Groups still queued when the job stops return nothing instead of calling the model.
+        if self._stop.is_set():
+            return []
+        return generate_pairs(context_text)
+
+    def _saved(self, rows, returned):
+        get_question_catalog().mark_changed([row[0] for row in returned])
+        self._update(saved=len(returned))
+
+    def run(self):
+        started = time.time()
+        self._update(status="running", started_at=started)
+        try:
+            chunks = self.index.document_chunks(self.document_hash, self.namespace)
+            groups = chunk_groups(chunks, self.group_size)
+            self._update(groups_total=len(groups))
+
+            dedup = QuestionDeduplicator(self.topic, self.similarity_threshold)
+            workers = max(1, min(self.concurrency, get_llm_pool().max_concurrency - 1))
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"question-bank-{self.id[:8]}")
+            futures = [
+                executor.submit(self._generate, "\n\n".join(chunk["text"] for chunk in group))
+                for group in groups
+            ]
+
+            writer = BulkWriter(
+                get_connection, "questions", QUESTION_INSERT_COLUMNS, method=self.write_method,
+                batch_size=self.insert_batch, on_conflict=self.on_conflict, returning=["id"], on_flush=self._saved
+            )
+            accepted = 0
+            for future in as_completed(futures):
+                try:
+                    pairs = future.result()
+                except Exception as e:
+                    logging.warning(f"Question generation failed for one chunk group: {e}")
+                    self._update(groups_done=1, failed_groups=1)
+                    continue
+
+                for pair in pairs:
+                    if self.max_questions and accepted >= self.max_questions:
+                        break
+                    if dedup.add(pair["question"]):
+                        writer.add((self.topic, pair["question"], pair["answer"], self.created_by, datetime.now()))
+                        accepted += 1
+                    else:
+                        self._update(duplicates=1)
+                self._update(groups_done=1, generated=len(pairs))
+
+                if self.max_questions and accepted >= self.max_questions:
+                    self._stop.set()
+                    break
+
+            self._stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            writer.flush()
+            self._update(status="done", finished_at=time.time())
+        except Exception as e:
+            self._stop.set()
+            logging.exception("Question bank generation failed")
+            self._update(status="failed", error=str(e), finished_at=time.time())
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name=f"question-bank-{self.id[:8]}", daemon=True)
+        self._thread.start()
+        return self
+
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+def start_question_bank_job(index, document_hash, namespace, topic, **options):
+    job = QuestionBankJob(index, document_hash, namespace, topic, **options)
+    with _jobs_lock:
+        _jobs[job.id] = job
+    return job.start()
+
+def get_question_bank_job(job_id):
+    with _jobs_lock:
+        return _jobs.get(job_id)
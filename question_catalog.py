@@ -0,0 +1,135 @@
+import threading
+import time
+from db import get_connection
+
+# ------------------ Question Catalog ------------------
+# Process-wide cache of the little question data pages still need in memory:
+# the topic list (one SELECT DISTINCT over questions_topic_id_idx) and, for the
+# duplicate index, the question texts of the topics it was asked about. Lists
+# of questions are paged from the server (pagination.py) and never cached here.
+# Per-topic texts are read in full once, then only rows past the topic's
+# highest id are fetched (an index range scan); pages that update or delete
+# questions report the change so those rows are re-read or dropped, and a
+# periodic full reload per topic picks up edits made by other server processes.
+QUESTION_COLUMNS = ("id", "topic_name", "question", "answer", "created_by", "created_at")
+
+class QuestionCatalog:
+    def __init__(self, min_refresh_interval=1.0, full_refresh_interval=300.0):
+        self.min_refresh_interval = min_refresh_interval
+        self.full_refresh_interval = full_refresh_interval
+        self._topics = None
+        self._topics_loaded = 0.0
+        self._texts = {}
+        self._dirty_ids = set()
+        self._version = 0
+        self._lock = threading.RLock()
+        self.stats = {"topic_loads": 0, "full_loads": 0, "incremental_loads": 0, "rows_fetched": 0}
+
+    # --- Loading ---
+    def _fetch(self, query, params=()):
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(query, params)
+            rows = cur.fetchall()
+            cur.close()
+        self.stats["rows_fetched"] += len(rows)
+        return rows
+
+    def _apply_dirty(self):
+        """Re-read changed ids once and update every cached topic with them."""
+        if not self._dirty_ids:
+            return
+        dirty = list(self._dirty_ids)
+        self._dirty_ids.clear()
+        self._topics = None
+        if not self._texts:
+            return
+        refreshed = self._fetch(
+            "SELECT id, topic_name, question FROM public.questions WHERE id = ANY(%s) ORDER BY id", (dirty,)
+        )
+        for entry in self._texts.values():
+            for question_id in dirty:
+                entry["texts"].pop(question_id, None)
+        for question_id, topic, question in refreshed:
+            entry = self._texts.get(topic)
+            if entry is not None:
+                entry["texts"][question_id] = question
+                entry["max_id"] = max(entry["max_id"], question_id)
+        self._version += 1
+
+    def _refresh_topic(self, topic):
+        now = time.monotonic()
+        self._apply_dirty()
+        entry = self._texts.get(topic)
+        changed = False
+        if entry is None or now - entry["loaded_at"] > self.full_refresh_interval:
+            rows = self._fetch(
+                "SELECT id, question FROM public.questions WHERE topic_name = %s ORDER BY id", (topic,)
+            )
+            entry = self._texts[topic] = {"texts": {}, "max_id": 0, "loaded_at": now, "refreshed_at": now}
+            self.stats["full_loads"] += 1
+            changed = True
+        elif now - entry["refreshed_at"] >= self.min_refresh_interval:
+            rows = self._fetch(
+                "SELECT id, question FROM public.questions WHERE topic_name = %s AND id > %s ORDER BY id",
+                (topic, entry["max_id"])
+            )
+            entry["refreshed_at"] = now
+            self.stats["incremental_loads"] += 1
+            changed = bool(rows)
+        else:
+            rows = []
+        for question_id, question in rows:
+            entry["texts"][question_id] = question
+            entry["max_id"] = max(entry["max_id"], question_id)
+        if changed:
+            self._version += 1
+        return entry
+
+    # --- Invalidation ---
+    def mark_changed(self, question_ids):
+        with self._lock:
+            self._dirty_ids.update(question_ids)
+
+    def mark_deleted(self, question_ids):
+        with self._lock:
+            for entry in self._texts.values():
+                for question_id in question_ids:
+                    entry["texts"].pop(question_id, None)
+            self._topics = None
+            self._version += 1
+
+    # --- Views ---
+    def topics(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._dirty_ids:
+                self._apply_dirty()
+            if self._topics is None or now - self._topics_loaded > self.min_refresh_interval:
+                # DISTINCT over (topic_name, id) reads questions_topic_id_idx, not the table.
+                rows = self._fetch("SELECT DISTINCT topic_name FROM public.questions ORDER BY topic_name")
+                self._topics = [row[0] for row in rows if row[0] is not None]
+                self._topics_loaded = now
+                self.stats["topic_loads"] += 1
+            return self._topics
+
+    def topic_questions(self, topic):
+        """{question id: question text} for one topic."""
+        with self._lock:
+            return dict(self._refresh_topic(topic)["texts"])
+
+    @property
+    def version(self):
+        return self._version
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_question_catalog():
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = QuestionCatalog()
+    return _catalog
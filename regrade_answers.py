@@ -0,0 +1,181 @@
+# regrade_answers.py
+# Headless re-grading of historical user_answers rows.
+#
+#   python regrade_answers.py --chunk-size 200 --workers 4
+#
+# Rows are streamed through a server-side cursor in id order, graded in parallel
+# chunks and written back with one bulk UPDATE per chunk. The id of the last
+# committed row is stored in a checkpoint file so a crashed run can resume,
+# together with the ids of rows whose grading failed; those are retried first
+# on the next run.
+import argparse
+import json
+import logging
+import os
+import time
+from bulk_writer import update_rows
+from db import get_connection
+from grading import grade_many, compute_final_score
+from llm_client import configure_llm_pool
+from scoring import score_pairs
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+DEFAULT_CHECKPOINT = ".regrade_checkpoint.json"
+
+# ------------------ Checkpoint ------------------
+class CheckpointMismatch(ValueError):
+    pass
+
+def load_checkpoint(path, topic=None):
+    """(last committed id, ids of rows whose grading failed) of a run over the same topic.
+
+    A checkpoint written by a run with a different --topic covers other rows,
+    so resuming from it would skip answers; that raises CheckpointMismatch.
+    """
+    if not os.path.exists(path):
+        return 0, []
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("topic") != topic:
+        raise CheckpointMismatch(
+            f"{path} belongs to a run with topic {checkpoint.get('topic')!r}, not {topic!r}; "
+            "rerun with that topic, pass --restart or use another --checkpoint"
+        )
+    return checkpoint.get("last_id", 0), checkpoint.get("failed_ids", [])
+
+def save_checkpoint(path, last_id, failed_ids=(), topic=None):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({
+            "last_id": last_id, "failed_ids": sorted(failed_ids), "topic": topic, "updated_at": time.time()
+        }, f)
+    os.replace(tmp_path, path)
+
+# ------------------ Streaming ------------------
+def stream_chunks(conn, after_id, chunk_size, topic=None, ids=None):
+    """Rows after after_id in id order, or only the given ids when ids is set."""
+    query = """
+        SELECT ua.id, ua.question_id, q.question, q.answer, ua.user_answer
+        FROM public.user_answers ua
+        JOIN public.questions q ON q.id = ua.question_id
+        WHERE {} AND COALESCE(ua.user_answer, '') <> ''
+    """.format("ua.id = ANY(%s)" if ids is not None else "ua.id > %s")
+    params = [list(ids) if ids is not None else after_id]
+    if topic:
+        query += " AND q.topic_name = %s"
+        params.append(topic)
+    query += " ORDER BY ua.id"
+
+    with conn.cursor(name="regrade_user_answers") as cur:
+        cur.itersize = chunk_size
+        cur.execute(query, params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+
+# ------------------ Grading ------------------
+def grade_chunk(rows):
+    """(updates, ids of rows whose grading failed); only graded rows are scored."""
+    grades = grade_many([(row[2], row[3], row[4]) for row in rows])
+
+    graded, failed = [], []
+    for row, result in zip(rows, grades):
+        if isinstance(result, Exception):
+            logging.warning(f"Grading failed for answer {row[0]}: {result}")
+            failed.append(row[0])
+            continue
+        if not result:
+            logging.warning(f"No grade returned for answer {row[0]}")
+            failed.append(row[0])
+            continue
+        try:
+            final_score = compute_final_score(result)
+        except (KeyError, TypeError):
+            logging.warning(f"Incomplete grade for answer {row[0]}: {result}")
+            failed.append(row[0])
+            continue
+        graded.append((row, result, final_score))
+
+    metrics = score_pairs([(row[1], row[3], row[4]) for row, _, _ in graded]) if graded else []
+    updates = [
+        (row[0], result.get("correctness", 0),
+         scores["bleu_score"], scores["rouge_score"], scores["bert_score"], final_score)
+        for (row, result, final_score), scores in zip(graded, metrics)
+    ]
+    return updates, failed
+
+def write_updates(conn, updates):
+    update_rows(
+        conn, "public.user_answers", "id",
+        ["correctness", "bleu_score", "rouge_score", "bert_score", "final_score"],
+        updates,
+        types=["integer", "integer", "double precision", "double precision", "double precision", "double precision"],
+        batch_size=max(len(updates), 1)
+    )
+
+# ------------------ Main ------------------
+def regrade(chunk_size=100, workers=4, checkpoint=DEFAULT_CHECKPOINT, restart=False, topic=None):
+    last_id, retry_ids = (0, []) if restart else load_checkpoint(checkpoint, topic)
+    if last_id:
+        logging.info(f"Resuming after user_answers.id = {last_id}")
+    if retry_ids:
+        logging.info(f"Retrying {len(retry_ids)} answers that failed to grade")
+
+    configure_llm_pool(max_concurrency=workers)
+    failed_ids = set(retry_ids)
+    failed_this_run = set()
+    processed = updated = 0
+    started = time.perf_counter()
+    # The streaming cursor keeps its own transaction open, so writes go through a second connection.
+    with get_connection() as read_conn, get_connection() as write_conn:
+        passes = [stream_chunks(read_conn, last_id, chunk_size, topic, ids=retry_ids)] if retry_ids else []
+        passes.append(stream_chunks(read_conn, last_id, chunk_size, topic))
+        for chunks in passes:
+            for rows in chunks:
+                chunk_started = time.perf_counter()
+                updates, failed = grade_chunk(rows)
+                write_updates(write_conn, updates)
+
+                failed_ids.difference_update(row[0] for row in rows)
+                failed_ids.update(failed)
+                failed_this_run.update(failed)
+                last_id = max(last_id, rows[-1][0])
+                save_checkpoint(checkpoint, last_id, failed_ids, topic)
+                processed += len(rows)
+                updated += len(updates)
+
+                chunk_rate = len(rows) / max(time.perf_counter() - chunk_started, 1e-9)
+                total_rate = processed / max(time.perf_counter() - started, 1e-9)
+                logging.info(
+                    f"{processed} rows ({updated} updated, {len(failed_ids)} failed, last id {last_id}) - "
+                    f"chunk {chunk_rate:.2f} rows/s, overall {total_rate:.2f} rows/s"
+                )
+            if chunks is not passes[-1]:
+                # Retried ids that were not returned (deleted or emptied answers) are dropped.
+                failed_ids.intersection_update(failed_this_run)
+                save_checkpoint(checkpoint, last_id, failed_ids, topic)
+
+    elapsed = time.perf_counter() - started
+    logging.info(f"Done: {processed} rows, {updated} updated in {elapsed:.1f}s ({processed / max(elapsed, 1e-9):.2f} rows/s)")
+    if failed_ids:
+        logging.warning(f"{len(failed_ids)} answers failed to grade; run again to retry them")
+    return processed, updated
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-grade stored user answers with the current rubric.")
+    parser.add_argument("--chunk-size", type=int, default=100, help="rows fetched and graded per chunk")
+    parser.add_argument("--workers", type=int, default=4, help="parallel grading requests per chunk")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="file holding the last committed id")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start from the first row")
+    parser.add_argument("--topic", help="only re-grade answers to questions of this topic")
+    args = parser.parse_args()
+    try:
+        regrade(args.chunk_size, args.workers, args.checkpoint, args.restart, args.topic)
+    except CheckpointMismatch as e:
+        parser.error(str(e))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import re
+import threading
+from collections import OrderedDict
+from nltk.tokenize import TreebankWordTokenizer
+from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
+from rouge_score import tokenizers
+from bertscore_engine import get_bertscore_engine
+
+# ------------------ Batched Metric Pipeline ------------------
+# Builds the tokenizers and smoothing function once and keeps the tokenized
+# form of each reference answer keyed by question id, so re-grading a topic only
+# tokenizes/stems every reference a single time.
+class MetricPipeline:
+    def __init__(self, max_cached_references=10000):
+        self.word_tokenizer = TreebankWordTokenizer()
+        self.rouge_tokenizer = tokenizers.DefaultTokenizer(use_stemmer=True)
+        self.smoothing = SmoothingFunction().method4
+        self.max_cached_references = max_cached_references
+        self._references = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"reference_hits": 0, "reference_misses": 0}
+
+    # --- Tokenization ---
+    def _tokenize(self, text):
+        return self.word_tokenizer.tokenize(text.lower()), self.rouge_tokenizer.tokenize(text)
+
+    def _reference_tokens(self, question_id, reference):
+        key = question_id if question_id is not None else ("text", reference)
+        with self._lock:
+            cached = self._references.get(key)
+            # An admin may have edited the answer since it was cached.
+            if cached is not None and cached[0] == reference:
+                self._references.move_to_end(key)
+                self.stats["reference_hits"] += 1
+                return cached[1]
+
+        tokens = self._tokenize(reference)
+        with self._lock:
+            self.stats["reference_misses"] += 1
+            self._references[key] = (reference, tokens)
+            self._references.move_to_end(key)
+            while len(self._references) > self.max_cached_references:
+                self._references.popitem(last=False)
+        return tokens
+
+    def invalidate(self, question_id=None):
+        with self._lock:
+            if question_id is None:
+                self._references.clear()
+            else:
+                self._references.pop(question_id, None)
+
+    # --- Metrics ---
+    def _bleu(self, reference_tokens, candidate_tokens):
+        return sentence_bleu([reference_tokens], candidate_tokens, smoothing_function=self.smoothing) * 100
+
+    @staticmethod
+    def _rouge_l(reference_tokens, candidate_tokens):
+        # Same LCS F-measure as rouge_score's rougeL, on pre-tokenized input.
+        if not reference_tokens or not candidate_tokens:
+            return 0.0
+        previous = [0] * (len(candidate_tokens) + 1)
+        for ref_token in reference_tokens:
+            current = [0]
+            for j, cand_token in enumerate(candidate_tokens):
+                if ref_token == cand_token:
+                    current.append(previous[j] + 1)
+                else:
+                    current.append(max(previous[j + 1], current[j]))
+            previous = current
+        lcs = previous[-1]
+        precision = lcs / len(candidate_tokens)
+        recall = lcs / len(reference_tokens)
+        if precision + recall == 0:
+            return 0.0
+        return 2 * precision * recall / (precision + recall) * 100
+
+    def bleu(self, reference, candidate, question_id=None):
+        reference_tokens, _ = self._reference_tokens(question_id, reference)
+        return self._bleu(reference_tokens, self.word_tokenizer.tokenize(candidate.lower()))
+
+    def rouge_l(self, reference, candidate, question_id=None):
+        _, reference_tokens = self._reference_tokens(question_id, reference)
+        return self._rouge_l(reference_tokens, self.rouge_tokenizer.tokenize(candidate))
+
+    def score_pairs(self, pairs, include_bert=True):
+        """Score (question_id, reference, candidate) tuples in one pass.
+
+        Returns a list of {"bleu_score", "rouge_score", "bert_score"} dicts in
+        input order; BERTScore runs as a single batch over all pairs.
+        """
+        pairs = list(pairs)
+        results = []
+        for question_id, reference, candidate in pairs:
+            bleu_tokens, rouge_tokens = self._reference_tokens(question_id, reference)
+            candidate_bleu, candidate_rouge = self._tokenize(candidate)
+            results.append({
+                "bleu_score": self._bleu(bleu_tokens, candidate_bleu),
+                "rouge_score": self._rouge_l(rouge_tokens, candidate_rouge),
+            })
+
+        if include_bert and pairs:
+            bert_scores = get_bertscore_engine().score(
+                [reference for _, reference, _ in pairs],
+                [candidate for _, _, candidate in pairs],
+            )
+            for result, bert in zip(results, bert_scores):
+                result["bert_score"] = bert
+        return results
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+def get_metric_pipeline():
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = MetricPipeline()
+    return _pipeline
+
+def score_pairs(pairs, include_bert=True):
+    return get_metric_pipeline().score_pairs(pairs, include_bert=include_bert)
+
+# ------------------ Word Error Rate ------------------
+def _words(text):
+    return re.sub(r"[^a-z0-9' ]+", " ", str(text).lower()).split()
+
+def word_error_rate(reference, hypothesis):
+    """(substitutions + deletions + insertions) / reference words, on lower-cased words without punctuation."""
+    reference, hypothesis = _words(reference), _words(hypothesis)
+    if not reference:
+        return float(bool(hypothesis))
+    previous = list(range(len(hypothesis) + 1))
+    for i, word in enumerate(reference, start=1):
+        current = [i] + [0] * len(hypothesis)
+        for j, other in enumerate(hypothesis, start=1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (word != other))
+        previous = current
+    return previous[-1] / len(reference)
@@ -1,67 +1,88 @@
 import streamlit as st
-import whisper
-import sounddevice as sd
-from scipy.io.wavfile import write
-import numpy as np
-import tempfile
-import time
+from multiprocessing import AuthenticationError
+from transcription_worker import AUTHKEY_MISMATCH_MESSAGE, get_transcription_client
+from audio import SAMPLE_RATE
+from live_transcription import LiveTranscriber
 
-# Load model once
-@st.cache_resource
+# The model is loaded once, in the shared transcription worker
 def load_whisper_model():
-    return whisper.load_model("small")
+    return get_transcription_client()
 
 st.title("🎙️ Speak and Stop Recording Anytime")
 
-sample_rate = 16000
-channels = 1
+sample_rate = SAMPLE_RATE
 
 # Session state to manage recording
 if 'is_recording' not in st.session_state:
     st.session_state.is_recording = False
-if 'audio_buffer' not in st.session_state:
-    st.session_state.audio_buffer = None
-if 'audio_path' not in st.session_state:
-    st.session_state.audio_path = None
+if 'audio' not in st.session_state:
+    st.session_state.audio = None
 if 'transcription' not in st.session_state:
     st.session_state.transcription = ""
 
 # Start recording button
 if not st.session_state.is_recording:
     if st.button("🟢 Start Recording"):
-        st.session_state.audio_buffer = sd.rec(
-            int(60 * sample_rate),  # record max up to 60s to simulate live
-            samplerate=sample_rate,
-            channels=channels,
-            dtype='int16'
-        )
-        sd.sleep(100)  # sleep a bit to get buffer started
-        st.session_state.start_time = time.time()
+        # Records up to 60s and transcribes in windows while recording
+        st.session_state.live = LiveTranscriber(load_whisper_model(), sample_rate=sample_rate).start()
         st.session_state.is_recording = True
         st.info("Recording... Click 'Stop' when you're done.")
 
 # Stop recording button
 if st.session_state.is_recording:
     if st.button("🔴 Stop Recording"):
-        sd.stop()
-        duration_recorded = int((time.time() - st.session_state.start_time) * sample_rate)
-        trimmed_audio = st.session_state.audio_buffer[:duration_recorded]
+        live = st.session_state.pop("live")
+        st.session_state.transcription = live.stop()  # only the last window is left to decode
 
-        # Save to WAV
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_file:
-            write(tmp_file.name, sample_rate, trimmed_audio)
-            st.session_state.audio_path = tmp_file.name
+        # Keep the clip in memory as Whisper-ready float32
+        st.session_state.audio = live.audio()
 
         st.session_state.is_recording = False
-        st.success("Recording stopped! You can now transcribe.")
+        st.success("Recording stopped!")
 
-# Transcribe
-if st.session_state.audio_path and st.button("📝 Transcribe"):
-    st.info("Transcribing...")
-    model = load_whisper_model()
-    result = model.transcribe(st.session_state.audio_path)
+# Live partial transcript while recording
+@st.experimental_fragment(run_every=1)
+def show_live_transcript():
+    live = st.session_state.get("live")
+    if live is not None:
+        st.info(live.text() or "Listening…")
+
+if st.session_state.is_recording and "live" in st.session_state:
+    show_live_transcript()
+
+# Transcribe (queued on the worker, polled until done)
+if st.session_state.audio is not None and st.button("📝 Transcribe again"):
+    try:
+        st.session_state.job = load_whisper_model().submit(st.session_state.audio)
+    except AuthenticationError:
+        st.error(f"❌ {AUTHKEY_MISMATCH_MESSAGE}")
+    except (EOFError, OSError) as e:
+        st.error(f"❌ Transcription worker unavailable: {e}")
+
+@st.experimental_fragment(run_every=1)
+def show_transcription_job():
+    client = load_whisper_model()
+    try:
+        result = client.result(st.session_state.job)
+        queue_depth = client.stats()["queue_depth"] if result is None else 0
+    except AuthenticationError:
+        del st.session_state.job
+        st.error(f"❌ {AUTHKEY_MISMATCH_MESSAGE}")
+        return
+    except (RuntimeError, KeyError, EOFError, OSError) as e:
+        # Failed job, expired result or the worker is gone: stop polling this job.
+        del st.session_state.job
+        st.error(f"❌ Transcription failed: {e}")
+        return
+    if result is None:
+        st.info(f"Transcribing... ({queue_depth} in queue)")
+        return
+    del st.session_state.job
     st.session_state.transcription = result["text"]
-    st.success("Done!")
+    st.rerun()
+
+if "job" in st.session_state:
+    show_transcription_job()
 
 # Display result
 if st.session_state.transcription:
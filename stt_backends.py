@@ -0,0 +1,94 @@
+import os
+import threading
+
+# ------------------ Speech-to-Text Backends ------------------
+# Every backend takes a float32 16 kHz array and returns whisper's result shape,
+# {"text": ..., "segments": [{"start", "end", "text"}, ...]}, so audio.py,
+# vad.py and live_transcription.py work with any of them. transcribe_batch()
+# decodes several clips of at most 30 s together and returns their texts.
+# Calls on one backend instance are serialized.
+#   whisper         openai-whisper, fp32 on CPU
+#   faster-whisper  CTranslate2 (int8 by default), much faster on CPU-only hosts
+# Selected with STT_BACKEND, STT_MODEL_SIZE, STT_COMPUTE_TYPE and STT_THREADS.
+DEFAULT_BACKEND = os.environ.get("STT_BACKEND", "whisper")
+DEFAULT_MODEL_SIZE = os.environ.get("STT_MODEL_SIZE", "small")
+DEFAULT_COMPUTE_TYPE = os.environ.get("STT_COMPUTE_TYPE", "int8")
+DEFAULT_THREADS = int(os.environ.get("STT_THREADS", "0"))  # 0 = library default
+
+class WhisperBackend:
+    name = "whisper"
+
+    def __init__(self, model_size=DEFAULT_MODEL_SIZE, threads=DEFAULT_THREADS, device="cpu"):
+        import torch
+        import whisper
+        if threads:
+            torch.set_num_threads(threads)
+        self.model_size = model_size
+        self.device = device
+        self.model = whisper.load_model(model_size, device=device)
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio, **options):
+        options.setdefault("fp16", self.device != "cpu")
+        with self._lock:
+            return self.model.transcribe(audio, **options)
+
+    def transcribe_batch(self, audios, language=None):
+        """One batched decoder pass over 30 s log-mel windows (longer clips are truncated)."""
+        import torch
+        import whisper
+        if not audios:
+            return []
+        mels = torch.stack([whisper.log_mel_spectrogram(whisper.pad_or_trim(audio)) for audio in audios])
+        options = whisper.DecodingOptions(fp16=self.device != "cpu", language=language, without_timestamps=True)
+        with self._lock:
+            results = whisper.decode(self.model, mels.to(self.model.device), options)
+        return [result.text.strip() for result in results]
+
+class FasterWhisperBackend:
+    name = "faster-whisper"
+    # whisper.transcribe options that faster-whisper understands under the same name.
+    OPTIONS = ("language", "initial_prompt", "condition_on_previous_text", "temperature", "beam_size", "word_timestamps")
+
+    def __init__(self, model_size=DEFAULT_MODEL_SIZE, compute_type=DEFAULT_COMPUTE_TYPE, threads=DEFAULT_THREADS,
+                 device="cpu"):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise ImportError("STT_BACKEND=faster-whisper needs the faster-whisper package") from e
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.model = WhisperModel(model_size, device=device, compute_type=compute_type, cpu_threads=threads)
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio, **options):
+        options = {key: value for key, value in options.items() if key in self.OPTIONS and value is not None}
+        with self._lock:
+            segments, _ = self.model.transcribe(audio, **options)
+            # Segments are generated lazily; decode them while holding the lock.
+            segments = [{"start": segment.start, "end": segment.end, "text": segment.text} for segment in segments]
+        return {"text": "".join(segment["text"] for segment in segments), "segments": segments}
+
+    def transcribe_batch(self, audios, language=None):
+        # faster-whisper 1.0 has no batched pipeline; clips are decoded one after another.
+        return [self.transcribe(audio, language=language)["text"].strip() for audio in audios]
+
+BACKENDS = {backend.name: backend for backend in (WhisperBackend, FasterWhisperBackend)}
+
+def load_stt_backend(name=None, **options):
+    name = name or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"unknown speech-to-text backend {name!r}; choose one of {', '.join(BACKENDS)}")
+    return BACKENDS[name](**options)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_stt_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = load_stt_backend()
+    return _backend
@@ -0,0 +1,42 @@
+import json
+import numpy as np
+from langchain_core.documents import Document
+from document_index import DocumentIndex
+
+WORDS = ["alpha", "beta", "gamma", "orphan"]
+
+class KeywordEmbeddings:
+    """One dimension per known word, so a query for a word finds the chunk that contains it."""
+    def _vector(self, text):
+        vector = np.array([float(word in text.lower()) for word in WORDS], dtype=np.float32)
+        return vector + 0.01
+
+    def embed_documents(self, texts):
+        return [self._vector(text).tolist() for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text).tolist()
+
+def test_orphan_chunk_lines_after_crash_are_dropped(tmp_path):
+    index = DocumentIndex(KeywordEmbeddings(), root=str(tmp_path), mmap=False)
+    index.add_document("d1", [Document(page_content="alpha text", metadata={"page": 1})], namespace="t")
+
+    # A crash after writing chunks.jsonl but before saving vectors.npy.
+    chunks_path = tmp_path / "t" / "chunks.jsonl"
+    with open(chunks_path, "a") as f:
+        f.write(json.dumps({"hash": "x", "text": "ORPHAN", "metadata": {"page": 9}}) + "\n")
+
+    index = DocumentIndex(KeywordEmbeddings(), root=str(tmp_path), mmap=False)
+    index.add_document("d2", [Document(page_content="beta text", metadata={"page": 2})], namespace="t")
+
+    hits = index.similarity_search("beta", k=1, namespace="t")
+    assert [hit.page_content for hit in hits] == ["beta text"]
+    assert [chunk["text"] for chunk in index.document_chunks("d2", namespace="t")] == ["beta text"]
+
+    # The files agree again, also for a process that opens them fresh.
+    lines = chunks_path.read_text().splitlines()
+    vectors = np.load(tmp_path / "t" / "vectors.npy")
+    assert len(lines) == len(vectors) == 2
+    reopened = DocumentIndex(KeywordEmbeddings(), root=str(tmp_path), mmap=False)
+    assert [chunk["text"] for chunk in reopened.document_chunks("d1", namespace="t")] == ["alpha text"]
+    assert [hit.page_content for hit in reopened.similarity_search("beta", k=1, namespace="t")] == ["beta text"]
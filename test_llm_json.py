@@ -0,0 +1,25 @@
+import time
+from llm_json import extract_json, iter_json_spans, try_extract_json
+
+EVALUATION = '{"correctness": 1, "completeness": 60, "relevance": 70, "depth": 40}'
+
+def test_quoted_or_stray_brackets_do_not_hide_the_answer():
+    assert extract_json('He wrote "{" then ' + EVALUATION, "evaluation")["depth"] == 40
+    assert extract_json("Mind the { in prose. " + EVALUATION, "evaluation")["depth"] == 40
+    assert extract_json("Broken { ] here. " + EVALUATION, "evaluation")["depth"] == 40
+
+def test_truncated_answer_is_completed():
+    assert list(iter_json_spans('Answer: {"x": [1, 2')) == ['{"x": [1, 2]}']
+
+def test_unclosed_brackets_are_scanned_once():
+    started = time.perf_counter()
+    assert extract_json("{" * 20000 + EVALUATION, "evaluation")["depth"] == 40
+    assert try_extract_json("{" * 20000, "evaluation") is None
+    assert len(list(iter_json_spans("[" * 20000))) == 1
+    assert time.perf_counter() - started < 2
+
+def test_deeply_nested_input_is_not_a_recursion_error():
+    started = time.perf_counter()
+    assert extract_json("[" * 20000 + "]" * 20000 + EVALUATION, "evaluation")["depth"] == 40
+    assert try_extract_json("[" * 20000 + "]" * 20000, "evaluation") is None
+    assert time.perf_counter() - started < 2
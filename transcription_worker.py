@@ -0,0 +1,311 @@
+# transcription_worker.py
+# Local speech-to-text service shared by all Streamlit processes.
+#
+#   python transcription_worker.py
+#
+# The worker holds the only speech-to-text model (stt_backends.get_stt_backend)
+# and serves jobs over a local socket (multiprocessing.connection). Pages submit
+# audio and poll for the result; the first page that finds no worker listening
+# starts one. Whole answers are split at pauses (vad.py) and the chunks of
+# every job waiting in the queue are decoded in one batch; live-transcription
+# windows, which need segment timestamps, are decoded one by one. Queue depth,
+# batch sizes and latencies are reported by stats().
+#
+# Messages are pickles, so the connection authkey is what keeps other local
+# users out. It comes from TRANSCRIBE_AUTHKEY or, when that is unset, from a
+# random key created on first use in a 0600 file (TRANSCRIBE_AUTHKEY_FILE)
+# that the worker and the pages both read.
+#
+# Every request is safe to send twice, which the client does after a lost
+# reply: job ids are chosen by the client, so a repeated submit finds its job
+# already queued instead of transcribing it again, and results stay readable
+# until they expire (RESULT_TTL_SECONDS) rather than being dropped on read.
+import logging
+import os
+import queue
+import secrets
+import stat
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from multiprocessing.connection import Client, Listener
+from audio import SAMPLE_RATE
+
+WORKER_HOST = os.environ.get("TRANSCRIBE_HOST", "127.0.0.1")
+WORKER_PORT = int(os.environ.get("TRANSCRIBE_PORT", "6010"))
+AUTHKEY_FILE = os.environ.get(
+    "TRANSCRIBE_AUTHKEY_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".transcription_authkey")
+)
+BATCH_SIZE = int(os.environ.get("TRANSCRIBE_BATCH_SIZE", "8"))
+# How long the worker waits for more jobs to join a batch.
+BATCH_WAIT_SECONDS = float(os.environ.get("TRANSCRIBE_BATCH_WAIT", "0.05"))
+RESULT_TTL_SECONDS = 600
+LISTEN_BACKLOG = 64
+STARTUP_TIMEOUT_SECONDS = 30
+POLL_INTERVAL_SECONDS = 0.05
+AUTHKEY_MISMATCH_MESSAGE = (
+    "authkey mismatch: the transcription worker rejected this page's key. Give the worker and the pages "
+    "the same TRANSCRIBE_AUTHKEY (or the same .transcription_authkey file) and restart the worker."
+)
+
+# ------------------ Authkey ------------------
+def load_authkey(path=AUTHKEY_FILE):
+    """TRANSCRIBE_AUTHKEY, else the key in path (created with a random key if missing)."""
+    if os.environ.get("TRANSCRIBE_AUTHKEY"):
+        return os.environ["TRANSCRIBE_AUTHKEY"].encode()
+    if not os.path.exists(path):
+        # Written to a private temp file and linked into place, so a concurrent
+        # reader never sees a partial key and the first writer wins.
+        tmp_path = f"{path}.{os.getpid()}.{secrets.token_hex(4)}"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp_path)
+    mode = os.stat(path).st_mode
+    if mode & (stat.S_IRWXG | stat.S_IRWXO):
+        raise PermissionError(f"{path} must only be accessible by its owner (chmod 600)")
+    with open(path) as f:
+        key = f.read().strip()
+    if not key:
+        raise ValueError(f"{path} is empty; delete it to generate a new key")
+    return key.encode()
+
+# ------------------ Worker ------------------
+class TranscriptionWorker:
+    def __init__(self, batch_size=BATCH_SIZE, batch_wait=BATCH_WAIT_SECONDS):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.backend = None
+        self._jobs = queue.Queue()
+        self._results = {}
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "batches": 0, "batched_jobs": 0, "audio_seconds": 0.0}
+
+    def serve(self, address=(WORKER_HOST, WORKER_PORT), authkey=None):
+        # Bind first so clients can connect (and queue jobs) while the model loads;
+        # a second worker fails here with "address already in use".
+        # The default backlog of 1 stalls clients that connect at the same moment.
+        listener = Listener(address, backlog=LISTEN_BACKLOG, authkey=authkey or load_authkey())
+        logging.info(f"Transcription worker listening on {address[0]}:{address[1]}")
+        threading.Thread(target=self._decode_loop, name="transcription-decoder", daemon=True).start()
+        while True:
+            try:
+                connection = listener.accept()
+            except Exception as e:
+                logging.warning(f"Rejected transcription client: {e}")
+                continue
+            threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+
+    def _handle(self, connection):
+        try:
+            while True:
+                connection.send(self._dispatch(connection.recv()))
+        except (EOFError, OSError):
+            pass
+        finally:
+            connection.close()
+
+    def _dispatch(self, request):
+        kind = request[0]
+        if kind == "submit":
+            _, job_id, audio, mode, options = request
+            with self._lock:
+                if job_id in self._results:
+                    return job_id
+                self._results[job_id] = {"status": "queued", "submitted_at": time.time()}
+                self.stats["submitted"] += 1
+            self._jobs.put((job_id, audio, mode, options or {}, time.perf_counter()))
+            return job_id
+        if kind == "result":
+            with self._lock:
+                job = self._results.get(request[1])
+                return dict(job) if job is not None else None
+        if kind == "stats":
+            return self.get_stats()
+        return {"status": "failed", "error": f"unknown request {kind!r}"}
+
+    # --- Decoding ---
+    def _next_batch(self):
+        batch = [self._jobs.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._jobs.get(timeout=remaining) if remaining > 0 else self._jobs.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _finish(self, job, **result):
+        job_id, audio, _, _, enqueued = job
+        with self._lock:
+            if job_id in self._results:
+                self._results[job_id].update(result, finished_at=time.time())
+            self.stats["completed" if result["status"] == "done" else "failed"] += 1
+            self.stats["audio_seconds"] += len(audio) / SAMPLE_RATE
+            self._latencies.append(time.perf_counter() - enqueued)
+
+    def _run_batch(self, batch):
+        from vad import split_at_pauses
+        for job in batch:
+            with self._lock:
+                if job[0] in self._results:
+                    self._results[job[0]]["status"] = "running"
+
+        whole = [job for job in batch if job[2] == "batch"]
+        if whole:
+            try:
+                chunks = [split_at_pauses(job[1]) for job in whole]
+                flat = [chunk for job_chunks in chunks for chunk in job_chunks]
+                texts = []
+                for start in range(0, len(flat), self.batch_size):
+                    texts.extend(self.backend.transcribe_batch(flat[start:start + self.batch_size]))
+                with self._lock:
+                    self.stats["batches"] += 1
+                    self.stats["batched_jobs"] += len(whole)
+                position = 0
+                for job, job_chunks in zip(whole, chunks):
+                    job_texts = texts[position:position + len(job_chunks)]
+                    position += len(job_chunks)
+                    self._finish(job, status="done", result={"text": " ".join(text for text in job_texts if text)})
+            except Exception as e:
+                logging.exception("Batched transcription failed")
+                for job in whole:
+                    self._finish(job, status="failed", error=str(e))
+
+        for job in batch:
+            if job[2] == "batch":
+                continue
+            try:
+                result = self.backend.transcribe(job[1], **job[3])
+                segments = [
+                    {"start": segment["start"], "end": segment["end"], "text": segment["text"]}
+                    for segment in result.get("segments") or []
+                ]
+                self._finish(job, status="done", result={"text": result["text"], "segments": segments})
+            except Exception as e:
+                logging.exception("Transcription failed")
+                self._finish(job, status="failed", error=str(e))
+
+    def _purge_results(self):
+        cutoff = time.time() - RESULT_TTL_SECONDS
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._results.items() if job.get("finished_at", time.time()) < cutoff]:
+                del self._results[job_id]
+
+    def _decode_loop(self):
+        from stt_backends import get_stt_backend
+        start = time.perf_counter()
+        self.backend = get_stt_backend()
+        logging.info(f"Loaded {self.backend.name} {self.backend.model_size} in {time.perf_counter() - start:.1f}s")
+        while True:
+            self._run_batch(self._next_batch())
+            self._purge_results()
+
+    def get_stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return dict(
+                self.stats,
+                queue_depth=self._jobs.qsize(),
+                model_loaded=self.backend is not None,
+                mean_batch=self.stats["batched_jobs"] / self.stats["batches"] if self.stats["batches"] else None,
+                latency_p50=latencies[len(latencies) // 2] if latencies else None,
+                latency_p95=latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None,
+            )
+
+# ------------------ Client ------------------
+class TranscriptionClient:
+    """Talks to the worker; also usable as the model for transcribe_array and LiveTranscriber."""
+    def __init__(self, address=(WORKER_HOST, WORKER_PORT), authkey=None, autostart=True):
+        self.address = address
+        self.authkey = authkey or load_authkey()
+        self.autostart = autostart
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _start_worker(self):
+        logging.info("Starting transcription worker")
+        subprocess.Popen([sys.executable, os.path.abspath(__file__)], start_new_session=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    def _connect(self):
+        try:
+            return Client(self.address, authkey=self.authkey)
+        except ConnectionRefusedError:
+            if not self.autostart:
+                raise
+        self._start_worker()
+        deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+        while True:
+            time.sleep(0.5)
+            try:
+                return Client(self.address, authkey=self.authkey)
+            except ConnectionRefusedError:
+                if time.monotonic() > deadline:
+                    raise
+
+    def _request(self, *message):
+        with self._lock:
+            for attempt in range(2):
+                if self._connection is None:
+                    self._connection = self._connect()
+                try:
+                    self._connection.send(message)
+                    return self._connection.recv()
+                except (EOFError, OSError):
+                    # The worker restarted or the reply was lost; reconnect and
+                    # send once more (every request is safe to repeat).
+                    self._connection = None
+                    if attempt:
+                        raise
+
+    def submit(self, audio, mode="batch", options=None):
+        """Queue float32 16 kHz audio; mode "batch" returns text only, "segments" also returns segments."""
+        return self._request("submit", uuid.uuid4().hex, audio, mode, options)
+
+    def result(self, job_id):
+        """The finished result dict, None while the job is queued or running; raises if it failed."""
+        job = self._request("result", job_id)
+        if job is None:
+            raise KeyError(f"unknown transcription job {job_id}")
+        if job["status"] == "failed":
+            raise RuntimeError(f"transcription failed: {job.get('error')}")
+        return job["result"] if job["status"] == "done" else None
+
+    def transcribe(self, audio, **options):
+        """Blocking, whisper-style call ({"text", "segments"}) for live-transcription windows."""
+        job_id = self.submit(audio, "segments", options)
+        while True:
+            result = self.result(job_id)
+            if result is not None:
+                return result
+            time.sleep(POLL_INTERVAL_SECONDS)
+
+    def stats(self):
+        return self._request("stats")
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_transcription_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = TranscriptionClient()
+    return _client
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    TranscriptionWorker().serve()
@@ -0,0 +1,101 @@
+import numpy as np
+from audio import SAMPLE_RATE, transcribe_array
+
+# ------------------ Voice Activity Detection ------------------
+# Energy-based speech detection over 30 ms frames, vectorized in NumPy. A frame
+# is speech when its RMS level is a margin above the clip's own noise floor
+# (a low percentile of the frame levels); short gaps inside speech are bridged
+# and short bursts dropped. Used to cut the leading/trailing silence of a
+# recording and to split long answers at pauses, so Whisper only decodes speech.
+FRAME_MS = 30
+MARGIN_DB = 12.0
+MIN_LEVEL_DB = -55.0
+PAD_MS = 150
+MIN_SPEECH_MS = 120
+MIN_PAUSE_MS = 300
+MAX_CHUNK_SECONDS = 30
+
+def frame_levels(audio, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS):
+    """RMS level in dBFS of each frame_ms frame (the last frame is zero-padded)."""
+    frame = int(sample_rate * frame_ms / 1000)
+    count = -(-len(audio) // frame)
+    if not count:
+        return np.empty(0, dtype=np.float32), frame
+    padded = np.zeros(count * frame, dtype=np.float32)
+    padded[:len(audio)] = audio
+    rms = np.sqrt(np.mean(padded.reshape(count, frame) ** 2, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10)), frame
+
+def _runs(mask):
+    """(start, end) index pairs of the True runs in a boolean array."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+def speech_mask(audio, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS, margin_db=MARGIN_DB,
+                min_level_db=MIN_LEVEL_DB, min_speech_ms=MIN_SPEECH_MS):
+    """Per-frame speech flags plus the frame levels and frame length in samples."""
+    levels, frame = frame_levels(audio, sample_rate, frame_ms)
+    if not len(levels):
+        return levels.astype(bool), levels, frame
+    threshold = max(np.percentile(levels, 10) + margin_db, min_level_db)
+    mask = levels > threshold
+
+    # Drop bursts shorter than min_speech_ms (clicks, bumps).
+    starts, ends = _runs(mask)
+    for start, end in zip(starts, ends):
+        if (end - start) * frame_ms < min_speech_ms:
+            mask[start:end] = False
+    return mask, levels, frame
+
+def has_speech(audio, sample_rate=SAMPLE_RATE):
+    return bool(speech_mask(audio, sample_rate)[0].any())
+
+def speech_regions(audio, sample_rate=SAMPLE_RATE, min_pause_ms=MIN_PAUSE_MS, pad_ms=PAD_MS, **options):
+    """Sample ranges of speech, each widened by pad_ms; pauses shorter than min_pause_ms do not split a region."""
+    mask, _, frame = speech_mask(audio, sample_rate, **options)
+    min_pause = int(min_pause_ms * sample_rate / 1000)
+    pad = int(pad_ms * sample_rate / 1000)
+    regions = []
+    starts, ends = _runs(mask)
+    for start, end in zip(starts * frame, ends * frame):
+        if regions and start - regions[-1][1] < min_pause:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+    return [(int(max(0, start - pad)), int(min(len(audio), end + pad))) for start, end in regions]
+
+def trim_silence(audio, sample_rate=SAMPLE_RATE, **options):
+    """Audio from the first to the last detected speech (empty if there is none)."""
+    regions = speech_regions(audio, sample_rate, **options)
+    if not regions:
+        return audio[:0]
+    return audio[regions[0][0]:regions[-1][1]]
+
+def split_at_pauses(audio, sample_rate=SAMPLE_RATE, max_chunk_seconds=MAX_CHUNK_SECONDS, **options):
+    """Speech-only chunks of at most max_chunk_seconds, cut at pauses; silence between chunks is dropped."""
+    max_samples = int(max_chunk_seconds * sample_rate)
+    levels, frame = frame_levels(audio, sample_rate)
+    chunks = []
+    for start, end in speech_regions(audio, sample_rate, **options):
+        if chunks and end - chunks[-1][0] <= max_samples:
+            chunks[-1] = (chunks[-1][0], end)
+            continue
+        # A region longer than the limit is cut at the quietest frame of the
+        # second half of each max_chunk_seconds stretch.
+        while end - start > max_samples:
+            first = (start + max_samples // 2) // frame
+            last = (start + max_samples) // frame
+            cut = max((first + int(np.argmin(levels[first:last]))) * frame, start + frame)
+            chunks.append((start, cut))
+            start = cut
+        chunks.append((start, end))
+    return [audio[start:end] for start, end in chunks]
+
+def transcribe_speech(model, audio, sample_rate=SAMPLE_RATE, **options):
+    """transcribe_array over the speech chunks only; returns {"text": ...}."""
+    texts = []
+    for chunk in split_at_pauses(audio, sample_rate):
+        text = transcribe_array(model, chunk, **options)["text"].strip()
+        if text:
+            texts.append(text)
+    return {"text": " ".join(texts)}
@@ -0,0 +1,168 @@
+import os
+import numpy as np
+
+# ------------------ Vectorized Similarity Search ------------------
+# Chunk embeddings live in one contiguous, L2-normalized float32 matrix, so
+# cosine similarity for a batch of queries is a single matrix product and top-k
+# selection is an argpartition instead of a full sort. Chunk metadata is kept
+# column-wise (topic/source as integer codes, page as int32) so filters become
+# boolean masks over the same rows. Matrices saved with save() can be reopened
+# memory-mapped.
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(vectors / norms, dtype=np.float32)
+
+class _Codes:
+    """String column stored as int32 codes."""
+    def __init__(self):
+        self.values = []
+        self.index = {}
+
+    def encode(self, value):
+        value = "" if value is None else str(value)
+        if value not in self.index:
+            self.index[value] = len(self.values)
+            self.values.append(value)
+        return self.index[value]
+
+    def lookup(self, value):
+        return self.index.get(str(value), -1)
+
+class VectorMatrix:
+    def __init__(self, dim=None, capacity=1024):
+        self.dim = dim
+        self._capacity = capacity
+        self._size = 0
+        self._vectors = None
+        self._topics = np.empty(0, dtype=np.int32)
+        self._sources = np.empty(0, dtype=np.int32)
+        self._pages = np.empty(0, dtype=np.int32)
+        self._topic_codes = _Codes()
+        self._source_codes = _Codes()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def vectors(self):
+        if self._vectors is None:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return self._vectors[:self._size]
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        if self._vectors is not None and needed <= len(self._vectors) and self._vectors.flags.writeable:
+            return
+        capacity = max(self._capacity, needed, 2 * (len(self._vectors) if self._vectors is not None else 0))
+        vectors = np.empty((capacity, self.dim), dtype=np.float32)
+        if self._size:
+            vectors[:self._size] = self._vectors[:self._size]
+        self._vectors = vectors
+        for name in ("_topics", "_sources", "_pages"):
+            column = np.full(capacity, -1, dtype=np.int32)
+            column[:self._size] = getattr(self, name)[:self._size]
+            setattr(self, name, column)
+
+    def add(self, vectors, metadatas=None):
+        """Append vectors (rows are normalized here); metadatas may carry topic, source and page."""
+        vectors = normalize_rows(vectors)
+        if not len(vectors):
+            return
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"expected {self.dim}-dimensional vectors, got {vectors.shape[1]}")
+        metadatas = metadatas or [{}] * len(vectors)
+
+        self._reserve(len(vectors))
+        end = self._size + len(vectors)
+        self._vectors[self._size:end] = vectors
+        for row, metadata in enumerate(metadatas, start=self._size):
+            self._set_metadata(row, metadata)
+        self._size = end
+
+    def _set_metadata(self, row, metadata):
+        self._topics[row] = self._topic_codes.encode(metadata.get("topic"))
+        self._sources[row] = self._source_codes.encode(metadata.get("source"))
+        page = metadata.get("page")
+        self._pages[row] = -1 if page is None else int(page)
+
+    def _mask(self, topic=None, source=None, page_range=None, rows=None):
+        mask = None
+        def combine(current, condition):
+            return condition if current is None else current & condition
+        if topic is not None:
+            mask = combine(mask, self._topics[:self._size] == self._topic_codes.lookup(topic))
+        if source is not None:
+            mask = combine(mask, self._sources[:self._size] == self._source_codes.lookup(source))
+        if page_range is not None:
+            pages = self._pages[:self._size]
+            first, last = page_range
+            mask = combine(mask, (pages >= first) & (pages <= last))
+        if rows is not None:
+            allowed = np.zeros(self._size, dtype=bool)
+            allowed[np.asarray(rows, dtype=np.int64)] = True
+            mask = combine(mask, allowed)
+        return mask
+
+    def search(self, queries, k=4, topic=None, source=None, page_range=None, rows=None):
+        """Top-k cosine search for one query vector or a (m, dim) batch.
+
+        Returns (indices, scores), each shaped (m, k') with k' <= k, best first.
+        Rows excluded by the filters never appear in the result.
+        """
+        queries = normalize_rows(queries)
+        if not self._size:
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0), dtype=np.float32)
+
+        mask = self._mask(topic, source, page_range, rows)
+        candidates = None
+        if mask is None:
+            scores = queries @ self.vectors.T
+        else:
+            candidates = np.flatnonzero(mask)
+            scores = queries @ self.vectors[candidates].T
+        available = scores.shape[1]
+
+        k = min(k, available)
+        if k <= 0:
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0), dtype=np.float32)
+        if k < scores.shape[1]:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(scores.shape[1]), (len(queries), 1))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        if candidates is not None:
+            top = candidates[top]
+        return top, top_scores
+
+    # --- Persistence ---
+    def save(self, path):
+        """Write the normalized matrix to an .npy file (metadata is the caller's concern)."""
+        tmp_path = path + ".tmp.npy"
+        np.save(tmp_path, self.vectors)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, metadatas=None, mmap=True, normalized=True):
+        """Open a saved matrix; with mmap the vectors stay on disk until searched."""
+        vectors = np.load(path, mmap_mode="r" if mmap else None)
+        if not normalized:
+            vectors = normalize_rows(vectors)
+        matrix = cls(dim=vectors.shape[1] if vectors.ndim == 2 else None)
+        matrix._vectors = vectors
+        matrix._size = len(vectors)
+        capacity = len(vectors)
+        matrix._topics = np.full(capacity, -1, dtype=np.int32)
+        matrix._sources = np.full(capacity, -1, dtype=np.int32)
+        matrix._pages = np.full(capacity, -1, dtype=np.int32)
+        for row, metadata in enumerate(metadatas or []):
+            matrix._set_metadata(row, metadata)
+        return matrix